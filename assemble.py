@@ -0,0 +1,75 @@
+from tqdm import tqdm
+
+
+def build_entries(stores, word_id, value):
+    """{lang: entry} for one word, one entry per store.
+
+    overview, extra and forms do not depend on the language, so they are
+    built once (from the first store) and shared by every entry.
+    """
+    first = next(iter(stores.values()))
+    Type = value.type
+    overview = {
+        "type": Type,
+        "accented": value.accented,
+        "derived_from_word": first.get_accented(value.derived_from_word_id),
+        "rank": value.rank
+    }
+    extra = first.get_extra_info(word_id, Type)
+    forms = first.get_forms(word_id)
+    return {
+        lang: {
+            "id": word_id,
+            "overview": overview,
+            "extra": extra,
+            "translations": store.get_translations(word_id),
+            "usage": store.get_usage(word_id),
+            "expressions": store.get_expressions(word_id, Type),
+            "sentences": store.get_sentences(word_id),
+            "forms": forms,
+            "relateds": store.get_relateds(word_id),
+        }
+        for lang, store in stores.items()
+    }
+
+
+def iter_entries(stores, batch_size=1000):
+    """Yields (bare, {lang: entries}) for every selected word, grouped by bare form.
+
+    stores maps each target language to a MemoryStore or an SQLiteStore over
+    the same data. Bare forms come in order of first appearance and their
+    entries in word order, as the old word_dict had them, but only one batch
+    of entries is alive at a time; each batch of (whole) bare groups is handed
+    to every store's prefetch before it is built.
+    """
+    selected = next(iter(stores.values())).selected()
+    print(len(selected))
+
+    groups = {}
+    for word_id, value in selected:
+        groups.setdefault(value.bare, []).append((word_id, value))
+    del selected
+
+    def build(pending, batch):
+        for store in stores.values():
+            store.prefetch(batch)
+        for bare, words in pending:
+            entries = {lang: [] for lang in stores}
+            for word_id, value in words:
+                for lang, entry in build_entries(stores, word_id, value).items():
+                    entries[lang].append(entry)
+            yield bare, entries
+        progress.update(len(batch))
+
+    with tqdm(total=sum(len(words) for words in groups.values())) as progress:
+        pending = []
+        batch = []
+        for bare, words in groups.items():
+            pending.append((bare, words))
+            batch.extend(words)
+            if len(batch) >= batch_size:
+                yield from build(pending, batch)
+                pending = []
+                batch = []
+        if batch:
+            yield from build(pending, batch)
@@ -0,0 +1,84 @@
+import json
+import os
+import re
+
+
+def encode_row(row):
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+
+
+class BankWriter:
+    """Streams rows into numbered bank files (term_bank_1.json, ...).
+
+    A bank is closed after chunk_size rows or, with max_bytes, before a row
+    would take it past that many UTF-8 bytes (a single larger row still gets
+    a bank of its own); pass chunk_size=None to split on size alone.
+    Only the file currently being written is open, so memory does not grow
+    with the number of rows. Banks left over from a previous run with the
+    same prefix are removed first.
+    """
+
+    def __init__(self, output_folder, prefix="term_bank_", chunk_size=25000, max_bytes=None):
+        if chunk_size is not None and chunk_size <= 0:
+            raise ValueError("Chunk size must be a positive integer.")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("Bank size must be a positive number of bytes.")
+        self.output_folder = output_folder
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.paths = []
+        self.total_rows = 0
+        self._file = None
+        self._rows_in_bank = 0
+        self._bytes_in_bank = 0
+
+        os.makedirs(output_folder, exist_ok=True)
+        stale = re.compile(rf"{re.escape(prefix)}\d+\.json")
+        for name in os.listdir(output_folder):
+            if stale.fullmatch(name):
+                os.remove(os.path.join(output_folder, name))
+
+    def write(self, row):
+        self.write_encoded(encode_row(row))
+
+    def write_encoded(self, encoded):
+        size = len(encoded.encode("utf-8")) if self.max_bytes else 0
+        if (
+            self._file is None
+            or self._rows_in_bank == self.chunk_size
+            # The comma before the row and the closing bracket after it
+            or (self.max_bytes and self._rows_in_bank and self._bytes_in_bank + size + 2 > self.max_bytes)
+        ):
+            self._next_bank()
+        else:
+            self._file.write(",")
+            self._bytes_in_bank += 1
+        self._file.write(encoded)
+        self._rows_in_bank += 1
+        self._bytes_in_bank += size
+        self.total_rows += 1
+
+    def _next_bank(self):
+        self._close_bank()
+        path = os.path.join(self.output_folder, f"{self.prefix}{len(self.paths) + 1}.json")
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[")
+        self._rows_in_bank = 0
+        self._bytes_in_bank = 1
+        self.paths.append(path)
+
+    def _close_bank(self):
+        if self._file is not None:
+            self._file.write("]")
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._close_bank()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
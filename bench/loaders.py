@@ -0,0 +1,162 @@
+# Times the grouped tables memory_store.py builds against the iterrows loops they replaced.
+# Run from the repository root: python bench/loaders.py [russian3 dir]
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loaders import *
+from records import GroupedTable
+
+
+def legacy_forms_dict(words_forms_csv):
+    words_forms_csv_dict = {}
+    for i, row in words_forms_csv.iterrows():
+        word_id = row["word_id"]
+        if words_forms_csv_dict.get(word_id) == None:
+            words_forms_csv_dict[word_id] = {}
+
+        form_type = row["form_type"]
+        form = row["form"]
+        if words_forms_csv_dict[word_id].get(form_type) == None:
+            words_forms_csv_dict[word_id][form_type] = form
+        else:
+            words_forms_csv_dict[word_id][form_type] += ", "+form
+    return words_forms_csv_dict
+
+
+def legacy_rels_dict(words_rels_csv):
+    words_rels_csv_dict = {}
+    for i, row in words_rels_csv.iterrows():
+        word_id = row["word_id"]
+        rel_word_id = row["rel_word_id"]
+        relation = row["relation"]
+
+        if words_rels_csv_dict.get(word_id) == None:
+            words_rels_csv_dict[word_id] = {
+                "related": [],
+                "synonym": [],
+                "antonym": []
+            }
+        if rel_word_id not in words_rels_csv_dict[word_id][relation]:
+            words_rels_csv_dict[word_id][relation].append(rel_word_id)
+
+        if words_rels_csv_dict.get(rel_word_id) == None:
+            words_rels_csv_dict[rel_word_id] = {
+                "related": [],
+                "synonym": [],
+                "antonym": []
+            }
+        if word_id not in words_rels_csv_dict[rel_word_id][relation]:
+            words_rels_csv_dict[rel_word_id][relation].append(word_id)
+    return words_rels_csv_dict
+
+
+def legacy_translations_dict(translations_csv):
+    translations_csv_dict = {}
+    for i, row in translations_csv.iterrows():
+        word_id = row["word_id"]
+        if translations_csv_dict.get(word_id) == None:
+            translations_csv_dict[word_id] = []
+
+        translations_csv_dict[word_id].append([
+            row["tl"],
+            row["example_ru"],
+            row["example_tl"],
+            row["info"],
+        ])
+    return translations_csv_dict
+
+
+def legacy_word_to_sentence_dict(sentences_words_csv):
+    word_to_sentence_dict = {}
+    for i, row in sentences_words_csv.iterrows():
+        word_id = row["word_id"]
+        if word_to_sentence_dict.get(word_id) == None:
+            word_to_sentence_dict[word_id] = [row["sentence_id"]]
+        else:
+            word_to_sentence_dict[word_id].append(row["sentence_id"])
+    return word_to_sentence_dict
+
+
+def read_tables(folder):
+    def read(name, **kwargs):
+        return pd.read_csv(os.path.join(folder, f"russian3 - {name}.csv"), **kwargs)
+
+    words_forms_csv = read("words_forms", usecols=["word_id", "form_type", "form"])
+    words_forms_csv["form"] = words_forms_csv["form"].fillna("")
+    words_forms_csv = words_forms_csv.astype({"word_id": "int", "form_type": "string", "form": "string"})
+
+    words_rels_csv = read("words_rels", usecols=["word_id", "rel_word_id", "relation"])
+    words_rels_csv = words_rels_csv.astype({"word_id": "int", "rel_word_id": "int", "relation": "string"})
+
+    translations_csv = read("translations")
+    translations_csv = translations_csv[translations_csv["lang"] == "en"]
+    for column in ["example_ru", "example_tl", "info"]:
+        translations_csv[column] = translations_csv[column].fillna("")
+    translations_csv = translations_csv.astype({"word_id": "int", "tl": "string", "example_ru": "string", "example_tl": "string", "info": "string"})
+
+    sentences_words_csv = read("sentences_words", usecols=["sentence_id", "word_id"])
+    sentences_words_csv = sentences_words_csv.astype({"sentence_id": "int", "word_id": "int"})
+
+    return {
+        "words_forms": words_forms_csv,
+        "words_rels": words_rels_csv,
+        "translations": translations_csv,
+        "sentences_words": sentences_words_csv,
+    }
+
+
+def grouped_forms(words_forms_csv):
+    # Each word's forms as MemoryStore.get_forms returns them
+    table = GroupedTable(words_forms_csv, "word_id", ["form_type", "form"])
+    words_forms_csv_dict = {}
+    for word_id in table.index:
+        forms_dict = words_forms_csv_dict[word_id] = {}
+        for form_type, form in table.rows(word_id):
+            forms_dict[form_type] = form if form_type not in forms_dict else forms_dict[form_type] + ", " + form
+    return words_forms_csv_dict
+
+
+def grouped_translations(translations_csv):
+    table = GroupedTable(translations_csv, "word_id", ["tl", "example_ru", "example_tl", "info"])
+    return {word_id: table.rows(word_id) for word_id in table.index}
+
+
+def grouped_sentences(sentences_words_csv):
+    table = GroupedTable(sentences_words_csv, "word_id", ["sentence_id"])
+    return {word_id: table.column(word_id, "sentence_id") for word_id in table.index}
+
+
+BUILDERS = [
+    ("words_forms", legacy_forms_dict, grouped_forms),
+    ("words_rels", legacy_rels_dict, build_rels_dict),
+    ("translations", legacy_translations_dict, grouped_translations),
+    ("sentences_words", legacy_word_to_sentence_dict, grouped_sentences),
+]
+
+
+def timed(func, arg):
+    start = time.perf_counter()
+    result = func(arg)
+    return result, time.perf_counter() - start
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else "russian3"
+    tables = read_tables(folder)
+
+    print(f"{'table':<16}{'rows':>10}{'iterrows':>12}{'grouped':>12}{'speedup':>10}")
+    for name, legacy, vectorized in BUILDERS:
+        df = tables[name]
+        expected, legacy_time = timed(legacy, df)
+        result, vectorized_time = timed(vectorized, df)
+        if result != expected:
+            raise AssertionError(f"{vectorized.__name__} does not match the iterrows loop")
+        print(f"{name:<16}{len(df):>10}{legacy_time:>11.3f}s{vectorized_time:>11.3f}s{legacy_time / vectorized_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# Measures how many term bank rows per second term_bank renders, without the render cache or bank writing.
+# Run from the repository root after a build: python bench/render.py output/dict.bin [--limit 20000] [--check]
+import argparse
+import os
+import re
+import sys
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import term_bank
+from banks import encode_row
+from dictstore import DictReader
+from highlight import get_highlighter
+from term_bank import split_forms
+
+
+def legacy_glosses(translations, all_forms):
+    """The gloss list items as dicts, as term_bank built them before its templates."""
+    highlighter = get_highlighter(frozenset(all_forms))
+    glosses = []
+    for trans in translations:
+        main_text = trans[0]
+
+        if len(trans) > 3 and trans[3]:
+            extra_info = trans[3].lower().strip()
+            extra_info = re.sub(r"[.\!?,\s]+$", "", extra_info)
+            main_text += f" ({extra_info})"
+
+        trans_div = {"tag": "div", "content": [main_text]}
+
+        if trans[1] and trans[2]:
+            example_a = [
+                {"tag": "span", "data": {"content": "example-highlight"}, "content": part} if highlighted else part
+                for part, highlighted in highlighter.split(trans[1])
+            ]
+            example_content = {
+                "tag": "div",
+                "data": {"content": "extra-info"},
+                "content": {
+                    "tag": "div",
+                    "data": {"content": "example-sentence"},
+                    "content": [
+                        {"tag": "div", "data": {"content": "example-sentence-a"}, "content": example_a},
+                        {"tag": "div", "data": {"content": "example-sentence-b"}, "content": trans[2]},
+                    ],
+                },
+            }
+            details = {
+                "tag": "details",
+                "data": {"content": "details-entry-examples"},
+                "content": [
+                    {"tag": "summary", "data": {"content": "summary-entry"}, "content": "1 example"},
+                    example_content,
+                ],
+            }
+            trans_div["content"].append(details)
+
+        glosses.append({"tag": "li", "content": [trans_div]})
+    return glosses
+
+
+def legacy_rows(lemma, entries, props, variants, lang):
+    """The rows of term_bank.render_lemma as structures, built the way it did before its templates."""
+    form_rules = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("translations"):
+            continue
+        forms_dict = entry.get("forms", {})
+        overview = entry.get("overview", {})
+        extra = entry.get("extra", {})
+
+        tags = []
+        if "type" in overview:
+            tags.append(props["types"].get(overview["type"], {}).get("meaning", ""))
+        if "aspect" in extra:
+            tags.append(props["aspects"].get(extra["aspect"], {}).get("meaning", ""))
+        if "gender" in extra:
+            tags.append(props["genders"].get(extra["gender"], {}).get("meaning", ""))
+        if overview.get("type") == "noun":
+            for p in ["animate", "indeclinable", "sg_only", "pl_only"]:
+                if extra.get(p) is True:
+                    tags.append(props["noun_props"].get(p, {}).get("meaning", ""))
+
+        content = []
+        if entry.get("usage"):
+            content.append({"tag": "div", "content": [{
+                "tag": "details",
+                "data": {"content": "details-entry-Usage"},
+                "content": [
+                    {"tag": "summary", "data": {"content": "summary-entry"}, "content": "Usage"},
+                    {"tag": "div", "data": {"content": "Usage-content"}, "content": entry["usage"]},
+                ],
+            }]})
+        all_forms = [lemma] + [v for v in forms_dict.values() if isinstance(v, str) and v]
+        content.append({"tag": "ol", "data": {"content": "glosses"}, "content": legacy_glosses(entry["translations"], all_forms)})
+        content.append({
+            "tag": "div",
+            "data": {"content": "backlink"},
+            "content": [{"tag": "a", "href": f"https://{lang}.openrussian.org/ru/{urllib.parse.quote(lemma)}", "content": "OpenRussian"}],
+        })
+        yield [
+            lemma, overview.get("accented", lemma), " ".join(t for t in tags if t), "", 0,
+            [{"type": "structured-content", "content": content}], 0, "",
+        ]
+
+        for form_key, form_value in forms_dict.items():
+            if form_value and isinstance(form_value, str):
+                rule_desc = props["forms"].get(form_key, {}).get("meaning", form_key)
+                for form in split_forms(form_value):
+                    rules = form_rules.setdefault(form, [])
+                    if rule_desc not in rules:
+                        rules.append(rule_desc)
+
+    for form, rules in form_rules.items():
+        yield [variants[form], form, "non-lemma", "", 0, [[lemma, [rule]] for rule in rules], 0, ""]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark of term bank rendering.")
+    parser.add_argument("input_file", nargs="?", default="output/dict.bin")
+    parser.add_argument("--limit", type=int, default=None, help="only render the first N lemmas")
+    parser.add_argument("--shard-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3, help="keep the fastest of N passes")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--check", action="store_true", help="also check every lemma's rows against json.dumps of the dict structures the templates replaced")
+    args = parser.parse_args()
+
+    dictionary = DictReader(args.input_file)
+    offsets = list(dictionary.index.values())[:args.limit]
+    shards = list(term_bank.iter_shards(offsets, args.shard_size))
+    term_bank._init_worker(args.input_file, dictionary, args.lang)
+
+    best = None
+    for _ in range(args.repeat):
+        # Each pass compiles its highlighters again, as a fresh worker would
+        get_highlighter.cache_clear()
+        rendered = []
+        start = time.perf_counter()
+        for shard in shards:
+            rendered.extend(term_bank._render_shard(shard))
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    rows = sum(len(lemma_rows) for lemma_rows in rendered)
+    print(f"{len(offsets)} lemmas, {rows} rows: {best:.3f}s, {rows / best:,.0f} rows/s (best of {args.repeat})")
+
+    if args.check:
+        # The templates must give exactly json.dumps of the dict structures they replaced
+        mismatched = 0
+        for shard in shards:
+            records = [dictionary.read_at(offset) for offset in shard]
+            variants = term_bank.shard_variants(records)
+            for (lemma, entries), lemma_rows in zip(records, term_bank._render_shard(shard)):
+                expected = [encode_row(row) for row in legacy_rows(lemma, entries, term_bank._worker_props, variants, args.lang)]
+                mismatched += expected != lemma_rows
+        if mismatched:
+            raise SystemExit(f"{mismatched} lemmas render differently from json.dumps of their dict structures")
+        print("All rows match json.dumps of their dict structures")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Times and memory-profiles each build stage on a synthetic dataset, writing the results as JSON.
+# Run from the repository root: python bench/run.py --scale 5 [--compare bench/results/<earlier>.json]
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "bench", "results")
+
+
+def merge_banks(workspace):
+    """Joins the term_bank stage's banks into one unsplit array, the input split_json gets."""
+    folder = os.path.join(workspace, "dict", "opr")
+    banks = [re.fullmatch(r"term_bank_(\d+)\.json", n) for n in os.listdir(folder)]
+    names = [m.group(0) for m in sorted(filter(None, banks), key=lambda m: int(m.group(1)))]
+    with open(os.path.join(workspace, "output", "term_bank.json"), "w", encoding="utf-8") as out:
+        out.write("[")
+        for name in names:
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                # Banks are written compact as "[row,row,...]"
+                items = f.read()[1:-1]
+            if items:
+                out.write(("," if out.tell() > 1 else "") + items)
+        out.write("]")
+
+
+def stages(jobs):
+    """(name, argv, cwd relative to the workspace, untimed preparation or None) for each stage, in build order."""
+    return [
+        ("generate_dict", [os.path.join(ROOT_DIR, "generate_dict.py")], ".", None),
+        ("term_bank", [os.path.join(ROOT_DIR, "term_bank.py"), "output/dict.bin", "--output", "dict/opr", "--jobs", str(jobs)], ".", None),
+        # Same input again: every lemma comes from the render cache the first run filled
+        ("term_bank_cached", [os.path.join(ROOT_DIR, "term_bank.py"), "output/dict.bin", "--output", "dict/opr", "--jobs", str(jobs)], ".", None),
+        ("zaliznyak_convert", [os.path.join(ROOT_DIR, "zaliznyak", "convert.py"), "--output", "../dict/zaliz"], "zaliznyak", None),
+        ("split_json", [os.path.join(ROOT_DIR, "split_json.py"), "output/term_bank.json", "split", "1000", "--yes"], ".", merge_banks),
+    ]
+
+
+def run_stage(argv, cwd, log):
+    """Runs one stage and returns its wall time, CPU time and peak RSS from os.wait4."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable] + argv, cwd=cwd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        "returncode": proc.returncode,
+        "seconds": round(seconds, 3),
+        "user": round(usage.ru_utime, 3),
+        "sys": round(usage.ru_stime, 3),
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "max_rss_mb": round(usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1),
+    }
+
+
+def make_workspace(workspace, data_dir, scale, seed, fresh=True):
+    """A scratch tree laid out like the repository, with the synthetic dataset in place.
+
+    fresh starts from an empty tree (so generate_dict and term_bank run with cold
+    snapshot and render caches); otherwise outputs and caches of earlier stages
+    are kept for a --stage rerun.
+    """
+    russian3 = os.path.join(data_dir, "russian3")
+    dictionary = os.path.join(data_dir, "dictionary")
+    if not os.path.isdir(russian3):
+        # In a child process: Linux carries ru_maxrss over fork and exec, so
+        # generating here would inflate the peak RSS of every stage after it
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT_DIR, "bench", "synth.py"), "--scale", str(scale), "--seed", str(seed), "--out", data_dir],
+            check=True,
+        )
+
+    if fresh:
+        shutil.rmtree(workspace, ignore_errors=True)
+    os.makedirs(os.path.join(workspace, "zaliznyak"), exist_ok=True)
+    for target, link in [
+        (os.path.abspath(russian3), os.path.join(workspace, "russian3")),
+        (os.path.abspath(dictionary), os.path.join(workspace, "zaliznyak", "dictionary")),
+        (os.path.join(ROOT_DIR, "props"), os.path.join(workspace, "props")),
+    ]:
+        if not os.path.lexists(link):
+            os.symlink(target, link)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Prints per-stage deltas against baseline; returns the stages that regressed."""
+    before = {s["name"]: s for s in baseline["stages"]}
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} ({baseline['created']}), scale {baseline['scale']:g}x:")
+    for stage in results["stages"]:
+        old = before.get(stage["name"])
+        if old is None:
+            continue
+        line = f"  {stage['name']:<20}"
+        for key in ("seconds", "max_rss_mb"):
+            delta = (stage[key] - old[key]) / old[key] if old[key] else 0.0
+            line += f"{key} {old[key]:>9} -> {stage[key]:<9} ({delta:+.1%})  "
+            if delta > tolerance:
+                regressions.append(f"{stage['name']} {key}")
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dictionary build on synthetic data.")
+    parser.add_argument("--scale", type=float, default=1, help="dataset size, see bench/synth.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default=None, help="dataset folder, generated if missing (default bench/data/<scale>x)")
+    parser.add_argument("--workspace", default=None, help="scratch folder for stage outputs (default bench/work/<scale>x)")
+    parser.add_argument("--stage", action="append", help="only run these stages (repeatable), reusing the workspace")
+    parser.add_argument("--repeat", type=int, default=1, help="keep the fastest of N runs of each stage")
+    parser.add_argument("--jobs", type=int, default=1, help="term_bank worker processes")
+    parser.add_argument("--output", default=None, help="results file (default bench/results/<time>-<scale>x.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown / growth before --compare fails")
+    args = parser.parse_args()
+
+    label = f"{args.scale:g}x"
+    data_dir = args.data or os.path.join(ROOT_DIR, "bench", "data", label)
+    workspace = args.workspace or os.path.join(ROOT_DIR, "bench", "work", label)
+    make_workspace(workspace, data_dir, args.scale, args.seed, fresh=not args.stage)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    results = {
+        "created": now.isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "data": os.path.abspath(data_dir),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "stages": [],
+    }
+
+    with open(os.path.join(workspace, "bench.log"), "w", encoding="utf-8") as log:
+        for name, argv, cwd, prepare in stages(args.jobs):
+            if args.stage and name not in args.stage:
+                continue
+            if prepare is not None:
+                prepare(workspace)
+            runs = []
+            for _ in range(args.repeat):
+                log.write(f"\n=== {name} ===\n")
+                log.flush()
+                stats_path = os.path.join(workspace, "stats", f"{name}.json")
+                runs.append(run_stage(argv + ["--stats", stats_path], os.path.join(workspace, cwd), log))
+                if runs[-1]["returncode"] != 0:
+                    raise SystemExit(f"{name} failed, see {log.name}")
+                # The stage's own breakdown, written through instrument.py
+                with open(stats_path, "r", encoding="utf-8") as f:
+                    runs[-1]["sections"] = json.load(f)["stages"]
+            stage = dict(min(runs, key=lambda r: r["seconds"]), name=name, runs=len(runs))
+            stage["max_rss_mb"] = max(r["max_rss_mb"] for r in runs)
+            results["stages"].append(stage)
+            print(f"{name:<20}{stage['seconds']:>9.3f}s  user {stage['user']:>8.3f}s  sys {stage['sys']:>7.3f}s  {stage['max_rss_mb']:>8.1f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{now:%Y%m%dT%H%M%S}-{label}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            raise SystemExit(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
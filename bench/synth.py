@@ -0,0 +1,263 @@
+# Writes a synthetic russian3 export (and a zaliznyak dictionary/ tree) for benchmarking.
+# Run from the repository root: python bench/synth.py --scale 5 --out bench/data/5x
+import argparse
+import bisect
+import csv
+import os
+import random
+
+
+# Words at scale 1; 20x is roughly the size of the real export
+BASE_WORDS = 5000
+SENTENCES_PER_WORD = 3
+LETTERS = "абвгдеёжзийклмнопрстуфхцчшщыьэюя"
+VOWELS = "аеёиоуыэюя"
+
+# (type, share of words)
+TYPES = [
+    ("noun", 0.45),
+    ("adjective", 0.15),
+    ("verb", 0.15),
+    ("adverb", 0.05),
+    ("other", 0.05),
+    ("expression", 0.07),
+    ("", 0.08),
+]
+
+CASES = ["nom", "gen", "dat", "acc", "inst", "prep"]
+FORM_TYPES = {
+    "noun": [f"ru_noun_{n}_{c}" for n in ("sg", "pl") for c in CASES],
+    "adjective": [f"ru_adj_{g}_{c}" for g in ("m", "f", "n", "pl") for c in CASES]
+    + ["ru_adj_comparative", "ru_adj_superlative", "ru_adj_short_m", "ru_adj_short_f", "ru_adj_short_n", "ru_adj_short_pl"],
+    "verb": [f"ru_verb_presfut_{p}" for p in ("sg1", "sg2", "sg3", "pl1", "pl2", "pl3")]
+    + ["ru_verb_past_m", "ru_verb_past_f", "ru_verb_past_n", "ru_verb_past_pl",
+       "ru_verb_imperative_sg", "ru_verb_imperative_pl", "ru_verb_gerund_past", "ru_verb_gerund_pres",
+       "ru_verb_participle_active_past", "ru_verb_participle_active_present", "ru_base"],
+}
+ENDINGS = {
+    "noun": ["", "а", "у", "ом", "е", "ы", "ов", "ам", "ами", "ах"],
+    "adjective": ["ый", "ого", "ому", "ым", "ом", "ая", "ой", "ую", "ое", "ые", "ых", "ее", "ейший"],
+    "verb": ["ю", "ешь", "ет", "ем", "ете", "ют", "л", "ла", "ло", "ли", "й", "йте", "в", "я", "вший", "ющий", "ть"],
+}
+ZALIZNYAK_INDEXES = {
+    "noun": [("м", "1a"), ("ж", "1a"), ("ж", "3*a"), ("с", "1c"), ("мо", "1a"), ("ж", "8a"), ("м", "3a//3b")],
+    "verb": [("нсв", "1a"), ("св", "4a"), ("нсв", "2a"), ("св-нсв", "14b/c"), ("нсв", "6°b/c")],
+}
+
+
+class Zipf:
+    """Draws 1..n with probability proportional to 1/rank**s."""
+
+    def __init__(self, rng, n, s=1.07):
+        self.rng = rng
+        self.cum_weights = []
+        total = 0.0
+        for rank in range(1, n + 1):
+            total += rank ** -s
+            self.cum_weights.append(total)
+
+    def __call__(self):
+        return bisect.bisect(self.cum_weights, self.rng.random() * self.cum_weights[-1]) + 1
+
+
+def geometric(rng, mean, low=0):
+    n = low
+    while rng.random() < mean / (mean + 1):
+        n += 1
+    return n
+
+
+def make_stem(rng):
+    length = max(2, min(10, int(rng.gauss(5, 1.7))))
+    return "".join(rng.choice(VOWELS if i % 2 else LETTERS) for i in range(length))
+
+
+def stress(word, rng):
+    """The russian3 accented form: an apostrophe after one vowel."""
+    positions = [i for i, c in enumerate(word) if c in VOWELS]
+    if not positions:
+        return word
+    i = rng.choice(positions)
+    return word[:i + 1] + "'" + word[i + 1:]
+
+
+def write_csv(folder, name, header, rows):
+    path = os.path.join(folder, f"russian3 - {name}.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def generate_russian3(folder, scale, seed):
+    """Writes the ten russian3 CSVs into folder and returns {table: rows}."""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    n = int(BASE_WORDS * scale)
+    types, shares = zip(*TYPES)
+    popular = Zipf(rng, n)
+
+    words = []
+    for word_id in range(1, n + 1):
+        Type = rng.choices(types, shares)[0]
+        if Type == "expression":
+            bare = " ".join(make_stem(rng) for _ in range(rng.randint(2, 4)))
+        else:
+            bare = make_stem(rng)
+        if words and rng.random() < 0.04:
+            # Homographs share a bare form across several word ids
+            bare = words[rng.randrange(len(words))]["bare"]
+        words.append({
+            "id": word_id,
+            "bare": bare,
+            "accented": " ".join(stress(part, rng) for part in bare.split(" ")),
+            "type": Type,
+            "disabled": 1 if rng.random() < 0.03 else 0,
+        })
+
+    counts = {}
+    counts["words"] = write_csv(
+        folder, "words",
+        ["id", "position", "bare", "accented", "derived_from_word_id", "rank", "disabled", "audio",
+         "usage_en", "usage_de", "number_value", "type", "level", "created_at"],
+        [
+            [w["id"], w["id"], w["bare"], w["accented"],
+             rng.randint(1, n) if rng.random() < 0.15 else "",
+             w["id"] if w["type"] else "",
+             w["disabled"], "",
+             "Used mostly in speech.\\nRarely written." if rng.random() < 0.06 else "",
+             "", "", w["type"], rng.choice(["A1", "A2", "B1", "B2", "C1", "C2", ""]), ""]
+            for w in words
+        ],
+    )
+
+    forms = []
+    forms_of = {}
+    for w in words:
+        form_types = FORM_TYPES.get(w["type"], [])
+        endings = ENDINGS.get(w["type"], [""])
+        stem = w["bare"]
+        for position, form_type in enumerate(form_types):
+            for variant in range(2 if rng.random() < 0.06 else 1):
+                form = stress(stem + rng.choice(endings), rng)
+                if rng.random() < 0.03:
+                    form = f"({form})"
+                forms.append([len(forms) + 1, w["id"], form_type, variant, form, form.replace("'", "")])
+                forms_of.setdefault(w["id"], []).append(form)
+    rng.shuffle(forms)
+    counts["words_forms"] = write_csv(folder, "words_forms", ["id", "word_id", "form_type", "position", "form", "_form_bare"], forms)
+
+    rels = [
+        [i, popular(), popular(), rng.choices(["related", "synonym", "antonym"], [0.6, 0.3, 0.1])[0]]
+        for i in range(int(n * 0.6))
+    ]
+    counts["words_rels"] = write_csv(folder, "words_rels", ["id", "word_id", "rel_word_id", "relation"], rels)
+
+    counts["nouns"] = write_csv(
+        folder, "nouns", ["word_id", "gender", "partner", "animate", "indeclinable", "sg_only", "pl_only"],
+        [
+            [w["id"], rng.choice(["m", "f", "n", "m", "f", "pl", "both", ""]),
+             stress(make_stem(rng), rng) if rng.random() < 0.1 else "",
+             rng.choice([0, 0, 1, ""]), rng.choice([0, 0, 0, 1, ""]), rng.choice([0, 0, 0, 1, ""]), rng.choice([0, 0, 0, 1, ""])]
+            for w in words if w["type"] == "noun"
+        ],
+    )
+    counts["verbs"] = write_csv(
+        folder, "verbs", ["word_id", "aspect", "partner", "imperative_sg"],
+        [
+            [w["id"], rng.choice(["imperfective", "perfective", "both", ""]),
+             ";".join(stress(make_stem(rng), rng) for _ in range(rng.randint(0, 2))), ""]
+            for w in words if w["type"] == "verb"
+        ],
+    )
+
+    expressions = []
+    for w in words:
+        if w["type"] == "expression":
+            for _ in range(rng.randint(1, 4)):
+                expressions.append([len(expressions), w["id"], popular(), 0, 3])
+    counts["expressions_words"] = write_csv(
+        folder, "expressions_words", ["id", "expression_id", "referenced_word_id", "start", "length"], expressions,
+    )
+
+    translations = []
+    for w in words:
+        for position in range(geometric(rng, 1.2, low=0 if rng.random() < 0.1 else 1)):
+            example = rng.random() < 0.35
+            form = rng.choice(forms_of.get(w["id"], [w["accented"]]))
+            translations.append([
+                len(translations), "en", w["id"], position, f"meaning {position + 1} of {w['bare']}",
+                f"Я вижу {form} дома." if example else "", "I see it at home." if example else "",
+                rng.choice(["", "", "", "colloquial", "figurative", "formal"]),
+            ])
+            if rng.random() < 0.4:
+                translations.append([len(translations), "de", w["id"], position, f"Bedeutung {position + 1}", "", "", ""])
+    counts["translations"] = write_csv(
+        folder, "translations", ["id", "lang", "word_id", "position", "tl", "example_ru", "example_tl", "info"], translations,
+    )
+
+    sentences = []
+    sentence_translations = []
+    sentence_words = []
+    for sentence_id in range(1, n * SENTENCES_PER_WORD + 1):
+        word_ids = [popular() for _ in range(rng.randint(3, 8))]
+        text = " ".join(rng.choice(forms_of.get(i, [words[i - 1]["accented"]])).strip("()") for i in word_ids)
+        sentences.append([sentence_id, text[0].upper() + text[1:] + ".", rng.choice(["A1", "A2", "B1", "B2"])])
+        sentence_translations.append([
+            sentence_id, sentence_id,
+            f"Sentence number {sentence_id}." if rng.random() < 0.85 else "",
+            f"Satz Nummer {sentence_id}." if rng.random() < 0.4 else "",
+        ])
+        for position, word_id in enumerate(word_ids):
+            sentence_words.append([len(sentence_words), sentence_id, word_id, position])
+    counts["sentences"] = write_csv(folder, "sentences", ["id", "ru", "level"], sentences)
+    counts["sentences_translations"] = write_csv(
+        folder, "sentences_translations", ["id", "sentence_id", "tl_en", "tl_de"], sentence_translations,
+    )
+    counts["sentences_words"] = write_csv(folder, "sentences_words", ["id", "sentence_id", "word_id", "position"], sentence_words)
+    return counts
+
+
+def generate_zaliznyak(folder, scale, seed):
+    """Writes a dictionary/ tree in the gramdict zalizniak-2010 layout, returns the line count."""
+    rng = random.Random(seed + 1)
+    lines = 0
+    for kind, subfolder, share in [("noun", "Нарицательные", 0.8), ("verb", "Глаголы", 0.2)]:
+        entries = {}
+        for _ in range(int(BASE_WORDS * scale * 4 * share)):
+            word = make_stem(rng) + ("ть" if kind == "verb" else "")
+            i = rng.choice([i for i, c in enumerate(word) if c in VOWELS] or [0])
+            reading = word[:i + 1] + "́" + word[i + 1:]
+            if rng.random() < 0.02:
+                reading = word + "/" + reading
+            prefix, index = rng.choice(ZALIZNYAK_INDEXES[kind])
+            line = f"{reading} {prefix} {index}"
+            if rng.random() < 0.1:
+                line += " (_мн. затрудн._)"
+            elif rng.random() < 0.05:
+                line += " _устар._"
+            entries.setdefault(word[0].upper(), []).append(line)
+
+        os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+        for letter, letter_lines in entries.items():
+            with open(os.path.join(folder, subfolder, f"{letter}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"# {subfolder}, {letter}\n\n")
+                f.write("\n".join(sorted(letter_lines)) + "\n")
+            lines += len(letter_lines)
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic russian3 export and zaliznyak dictionary.")
+    parser.add_argument("--scale", type=float, default=1, help=f"1 = {BASE_WORDS} words")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="defaults to bench/data/<scale>x")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", f"{args.scale:g}x")
+    counts = generate_russian3(os.path.join(out, "russian3"), args.scale, args.seed)
+    counts["zaliznyak_lines"] = generate_zaliznyak(os.path.join(out, "dictionary"), args.scale, args.seed)
+    for name, rows in counts.items():
+        print(f"{name:<24}{rows:>10}")
+    print(f"Written to {out}")
@@ -0,0 +1,365 @@
+# Builds the OpenRussian and Zaliznyak dictionaries as a graph of stages.
+# A stage runs again only when its inputs (files, folders and the local modules
+# of its script) changed since its last successful run, or an output is missing.
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from loaders import LANGS
+from snapshot import file_digest
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = ".cache/build.json"
+LOG_DIR = ".cache/build-logs"
+
+print_lock = threading.Lock()
+
+
+def say(*lines):
+    # Stage threads report concurrently, keep their lines whole
+    with print_lock:
+        print("\n".join(lines), flush=True)
+
+
+class Stage:
+    """One step of the build: a command, the paths it reads and the paths it writes.
+
+    Paths are relative to the repository root. Dependencies between stages are
+    not declared: a stage depends on every stage that writes one of its inputs.
+    once stages (downloads) are skipped whenever their outputs exist.
+    """
+
+    def __init__(self, name, argv, inputs, outputs, cwd=".", once=False):
+        self.name = name
+        self.argv = argv
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.cwd = cwd
+        self.once = once
+        if argv and argv[0].endswith(".py"):
+            # The script and the repository modules it imports are inputs too
+            self.inputs += local_modules(os.path.normpath(os.path.join(cwd, argv[0])))
+        self.deps = []
+
+    def command(self):
+        return ([sys.executable] if self.argv[0].endswith(".py") else ["bash"]) + self.argv
+
+
+def local_modules(script):
+    """script and the repository modules it imports, directly or not."""
+    found = []
+    pending = [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.append(path)
+        with open(os.path.join(ROOT_DIR, path), "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                # Scripts in subfolders put the root on sys.path, so look next to them and at the root
+                for folder in dict.fromkeys([os.path.dirname(path), ""]):
+                    candidate = os.path.join(folder, name.split(".")[0] + ".py")
+                    if os.path.isfile(os.path.join(ROOT_DIR, candidate)):
+                        pending.append(candidate)
+                        break
+    return sorted(found)
+
+
+def openrussian_stages(langs, revision):
+    stages = [
+        Stage(
+            "generate_dict",
+            ["generate_dict.py", "--langs", ",".join(langs)],
+            ["russian3"],
+            ["output/dict.bin" if lang == "en" else f"output/dict.{lang}.bin" for lang in langs],
+        )
+    ]
+    for lang in langs:
+        dict_file, dist_dir = ("output/dict.bin", "dict/opr") if lang == "en" else (f"output/dict.{lang}.bin", f"dict/opr-{lang}")
+        index_file = f"dict/opr-ru-{lang}-index.json"
+        stages.append(Stage(
+            f"term_bank:{lang}",
+            ["term_bank.py", dict_file, "--output", dist_dir, "--chunk-size", "25000", "--jobs", "0", "--lang", lang],
+            [dict_file, "props"],
+            [dist_dir],
+        ))
+        stages.append(Stage(
+            f"package:{lang}",
+            ["package.py", dist_dir, index_file, f"opr-ru-{lang}.zip", "--asset", "dict/tag_bank_1.json", "--asset", "dict/styles.css"]
+            + (["--revision", revision] if revision else []),
+            [dist_dir, index_file, "dict/tag_bank_1.json", "dict/styles.css"],
+            [f"opr-ru-{lang}.zip"],
+        ))
+    return stages
+
+
+def zaliznyak_stages(revision):
+    stages = [
+        Stage("zaliznyak:download", ["download.sh"], ["zaliznyak/download.sh"], ["zaliznyak/dictionary"], cwd="zaliznyak", once=True),
+        Stage(
+            "zaliznyak:convert",
+            ["convert.py", "--jobs", "0", "--output", "../dict/zaliz", "--bank-size", "1000"],
+            ["zaliznyak/dictionary"],
+            ["dict/zaliz/index", "dict/zaliz/prefix"],
+            cwd="zaliznyak",
+        ),
+    ]
+    for variant, name in [("index", "zaliznyak"), ("prefix", "zaliznyak-prefix")]:
+        index_file = f"dict/{name}-index.json"
+        # Same as zaliznyak.sh: a variant without an index file is not packaged
+        if not os.path.isfile(os.path.join(ROOT_DIR, index_file)):
+            print(f"Skipping {name}: {index_file} not found")
+            continue
+        stages.append(Stage(
+            f"package:{name}",
+            ["package.py", f"dict/zaliz/{variant}", index_file, f"{name}.zip"] + (["--revision", revision] if revision else []),
+            [f"dict/zaliz/{variant}", index_file],
+            [f"{name}.zip"],
+        ))
+    return stages
+
+
+def link(stages):
+    """Fills in each stage's deps; the stages must come in an order where writers precede readers."""
+    writers = {}
+    for stage in stages:
+        for path in stage.inputs:
+            for output, writer in writers.items():
+                if (path == output or path.startswith(output + "/") or output.startswith(path + "/")) and writer not in stage.deps:
+                    stage.deps.append(writer)
+        for output in stage.outputs:
+            writers[output] = stage
+
+
+class Fingerprints:
+    """Content digests of input paths, memoised by size and mtime in the build state."""
+
+    def __init__(self, files):
+        self.files = files
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            known = self.files.get(path)
+        if known and known[:2] == key:
+            return known[2]
+        digest = file_digest(path)
+        with self.lock:
+            self.files[path] = key + [digest]
+        return digest
+
+    def path(self, path):
+        full = os.path.join(ROOT_DIR, path)
+        if os.path.isfile(full):
+            return self.file(full)
+        if not os.path.isdir(full):
+            raise FileNotFoundError(f"Missing input: {path}")
+        digest = hashlib.sha256()
+        for folder, dirs, files in os.walk(full, followlinks=True):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                file_path = os.path.join(folder, name)
+                digest.update(os.path.relpath(file_path, full).encode())
+                digest.update(self.file(file_path).encode())
+        return digest.hexdigest()
+
+    def stage(self, stage):
+        digest = hashlib.sha256()
+        digest.update(json.dumps([stage.argv, stage.cwd]).encode())
+        for path in stage.inputs:
+            digest.update(path.encode())
+            digest.update(self.path(path).encode())
+        return digest.hexdigest()
+
+
+def load_state(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+
+def save_state(path, state, lock):
+    # Running stages keep adding file digests, so write a copy taken under their lock
+    with lock:
+        state = {"stages": dict(state["stages"]), "files": dict(state["files"])}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def run_stage(stage, fingerprints, state, force):
+    """Runs stage unless it is up to date; returns (status, seconds, fingerprint)."""
+    outputs_exist = all(os.path.exists(os.path.join(ROOT_DIR, p)) for p in stage.outputs)
+    if stage.once and outputs_exist and not force:
+        return "cached", 0.0, None
+    start = time.perf_counter()
+    fingerprint = fingerprints.stage(stage)
+    if not force and outputs_exist and state["stages"].get(stage.name) == fingerprint:
+        return "cached", time.perf_counter() - start, fingerprint
+
+    os.makedirs(os.path.join(ROOT_DIR, LOG_DIR), exist_ok=True)
+    log_path = os.path.join(ROOT_DIR, LOG_DIR, stage.name.replace(":", "_") + ".log")
+    say(f"[start] {stage.name}")
+    with open(log_path, "w", encoding="utf-8") as log:
+        # Stages run side by side, so each one writes to its own log instead of the terminal
+        returncode = subprocess.run(
+            stage.command(), cwd=os.path.join(ROOT_DIR, stage.cwd), stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+        ).returncode
+    seconds = time.perf_counter() - start
+    if returncode != 0:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as log:
+            tail = log.readlines()[-20:]
+        say(f"[failed] {stage.name} (exit {returncode}), last lines of {os.path.relpath(log_path, ROOT_DIR)}:", "".join(tail).rstrip())
+        return "failed", seconds, None
+    # Outputs were rewritten, so record the fingerprint of what this run read
+    return "built", seconds, fingerprint
+
+
+def critical_path(stages, seconds):
+    """The chain of dependent stages with the largest total time, and that time."""
+    finish = {}
+    via = {}
+    for stage in stages:
+        before = max(stage.deps, key=lambda d: finish[d.name], default=None)
+        finish[stage.name] = seconds.get(stage.name, 0.0) + (finish[before.name] if before else 0.0)
+        via[stage.name] = before
+    if not finish:
+        return [], 0.0
+    last = next(s for s in stages if s.name == max(finish, key=finish.get))
+    total = finish[last.name]
+    path = []
+    while last is not None:
+        path.append(last)
+        last = via[last.name]
+    return path[::-1], total
+
+
+def run(stages, jobs, force=False, dry_run=False, state_path=STATE_PATH):
+    """Runs the stages, each as soon as the stages it depends on finished; returns the failed stage names."""
+    state_path = os.path.join(ROOT_DIR, state_path)
+    state = load_state(state_path)
+    fingerprints = Fingerprints(state["files"])
+
+    if dry_run:
+        for stage in stages:
+            fresh = not force and all(os.path.exists(os.path.join(ROOT_DIR, p)) for p in stage.outputs)
+            if fresh and not stage.once:
+                try:
+                    fresh = state["stages"].get(stage.name) == fingerprints.stage(stage)
+                except FileNotFoundError:
+                    fresh = False
+            deps = ", ".join(d.name for d in stage.deps) or "-"
+            print(f"{stage.name:<28}{'up to date' if fresh else 'run':<12}after {deps}")
+        return []
+
+    statuses = {}
+    seconds = {}
+    failed = []
+    pending = list(stages)
+    running = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for stage in list(pending):
+                if any(statuses.get(d.name) in ("failed", "blocked") for d in stage.deps):
+                    statuses[stage.name] = "blocked"
+                    pending.remove(stage)
+                elif all(statuses.get(d.name) in ("built", "cached") for d in stage.deps):
+                    running[pool.submit(run_stage, stage, fingerprints, state, force)] = stage
+                    pending.remove(stage)
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    status, elapsed, fingerprint = future.result()
+                except FileNotFoundError as e:
+                    say(f"[failed] {stage.name}: {e}")
+                    status, elapsed, fingerprint = "failed", 0.0, None
+                statuses[stage.name] = status
+                seconds[stage.name] = elapsed
+                if status == "failed":
+                    failed.append(stage.name)
+                    state["stages"].pop(stage.name, None)
+                else:
+                    if fingerprint is not None:
+                        state["stages"][stage.name] = fingerprint
+                    if status == "built":
+                        say(f"[done] {stage.name} in {elapsed:.1f}s")
+                # Saved after every stage, so an interrupted build keeps what finished
+                save_state(state_path, state, fingerprints.lock)
+
+    print(f"\nBuild finished in {time.perf_counter() - start:.1f}s")
+    for stage in stages:
+        print(f"  {stage.name:<28}{statuses.get(stage.name, 'blocked'):<10}{seconds.get(stage.name, 0.0):>8.1f}s")
+    path, total = critical_path(stages, seconds)
+    if total > 0:
+        print(f"Critical path ({total:.1f}s): " + " -> ".join(f"{s.name} ({seconds.get(s.name, 0.0):.1f}s)" for s in path))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dictionaries, rerunning only the stages whose inputs changed.")
+    parser.add_argument("targets", nargs="*", default=["openrussian", "zaliznyak"],
+                        help="pipelines (openrussian, zaliznyak) or stage names, with the stages they depend on")
+    parser.add_argument("--langs", default="en", help=f"comma-separated target languages of openrussian, from {', '.join(LANGS)}")
+    parser.add_argument("--jobs", type=int, default=2, help="stages run at the same time")
+    parser.add_argument("--revision", help="index revision of the packages, defaults to package.py's")
+    parser.add_argument("--force", action="store_true", help="rerun stages even if they are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only show which stages would run")
+    args = parser.parse_args()
+
+    langs = [lang.strip() for lang in args.langs.split(",") if lang.strip()]
+    unknown = [lang for lang in langs if lang not in LANGS]
+    if unknown or not langs:
+        parser.error(f"unknown languages: {', '.join(unknown) or args.langs}")
+
+    pipelines = {"openrussian": openrussian_stages(langs, args.revision), "zaliznyak": zaliznyak_stages(args.revision)}
+    stages = [stage for group in pipelines.values() for stage in group]
+    link(stages)
+
+    # A target pulls in everything it depends on
+    by_name = {stage.name: stage for stage in stages}
+    wanted = set()
+    pending = []
+    for target in args.targets:
+        if target in pipelines:
+            pending.extend(pipelines[target])
+        elif target in by_name:
+            pending.append(by_name[target])
+        else:
+            parser.error(f"unknown target {target}, choose from {', '.join(list(pipelines) + list(by_name))}")
+    while pending:
+        stage = pending.pop()
+        if stage.name not in wanted:
+            wanted.add(stage.name)
+            pending.extend(stage.deps)
+
+    failed = run([stage for stage in stages if stage.name in wanted], max(1, args.jobs), args.force, args.dry_run)
+    if failed:
+        raise SystemExit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
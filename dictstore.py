@@ -0,0 +1,180 @@
+import json
+import mmap
+import os
+import struct
+
+import msgpack
+import numpy as np
+
+
+# Layout of output/dict.bin:
+#   MAGIC
+#   records:  <u32 length><msgpack [lemma, entries]>, in word_dict order
+#   index:    msgpack {lemma: record offset}
+#   footer:   <u64 index offset> FOOTER
+MAGIC = b"OPRD\x01"
+FOOTER = b"OPRI"
+RECORD_HEADER = struct.Struct("<I")
+FOOTER_STRUCT = struct.Struct("<Q4s")
+
+
+def encode_default(obj):
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class DictWriter:
+    """Writes (lemma, entries) records and the lemma index to a dict.bin file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+        self._packer = msgpack.Packer(default=encode_default)
+        self.index = {}
+
+    def write(self, lemma, entries):
+        record = self._packer.pack([lemma, entries])
+        self.index[lemma] = self._file.tell()
+        self._file.write(RECORD_HEADER.pack(len(record)))
+        self._file.write(record)
+
+    def close(self):
+        index_offset = self._file.tell()
+        self._file.write(self._packer.pack(self.index))
+        self._file.write(FOOTER_STRUCT.pack(index_offset, FOOTER))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+
+class JsonDictWriter:
+    """Writes (lemma, entries) records as the legacy dict.json object.
+
+    The output is byte for byte what json.dump(word_dict, ensure_ascii=False)
+    gives for the same records, without holding word_dict in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self._file.write("{")
+        self._separator = ""
+
+    def write(self, lemma, entries):
+        self._file.write(self._separator)
+        self._file.write(json.dumps(lemma, ensure_ascii=False))
+        self._file.write(": ")
+        self._file.write(json.dumps(entries, ensure_ascii=False, default=encode_default))
+        self._separator = ", "
+
+    def close(self):
+        self._file.write("}")
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+
+class DictReader:
+    """Memory-mapped access to a dict.bin file.
+
+    Iterating streams the records in file order; get() and read_at() decode a
+    single record through the lemma index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a dictionary store.")
+        index_offset, footer = FOOTER_STRUCT.unpack_from(self._mmap, len(self._mmap) - FOOTER_STRUCT.size)
+        if footer != FOOTER:
+            raise ValueError(f"{path} is truncated.")
+        self._index_offset = index_offset
+        self.index = msgpack.unpackb(self._mmap[index_offset:len(self._mmap) - FOOTER_STRUCT.size])
+
+    def _record(self, offset):
+        (length,) = RECORD_HEADER.unpack_from(self._mmap, offset)
+        start = offset + RECORD_HEADER.size
+        return msgpack.unpackb(self._mmap[start:start + length]), start + length
+
+    def read_at(self, offset):
+        (lemma, entries), _ = self._record(offset)
+        return lemma, entries
+
+    def raw_at(self, offset):
+        """The msgpack bytes of the record at offset, undecoded."""
+        (length,) = RECORD_HEADER.unpack_from(self._mmap, offset)
+        start = offset + RECORD_HEADER.size
+        return self._mmap[start:start + length]
+
+    def offsets(self):
+        return iter(self.index.values())
+
+    def get(self, lemma, default=None):
+        offset = self.index.get(lemma)
+        return default if offset is None else self.read_at(offset)[1]
+
+    def __getitem__(self, lemma):
+        return self.read_at(self.index[lemma])[1]
+
+    def __contains__(self, lemma):
+        return lemma in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        offset = len(MAGIC)
+        while offset < self._index_offset:
+            (lemma, entries), offset = self._record(offset)
+            yield lemma, entries
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_dict(path):
+    """A DictReader for dict.bin, or the parsed dict for a legacy dict.json."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return DictReader(path)
@@ -0,0 +1,66 @@
+import re
+from functools import lru_cache
+
+from normalize import strip_diacritics
+
+
+# Lemmas with more search terms than this are matched through a prefix trie
+TRIE_THRESHOLD = 24
+
+
+def trie_pattern(terms):
+    """Builds a regex equivalent to the longest-first alternation of terms.
+
+    Terms sharing a prefix share one branch, so the engine follows a single
+    path per position instead of trying every alternative. Longer
+    continuations are tried before ending a term, which keeps the
+    longest-first order (and its backtracking on a failed \\b).
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for c in term:
+            lower = c.lower()
+            node = node.setdefault(lower if len(lower) == 1 else c, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(c) + build(child) for c, child in sorted(node.items()) if c]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class Highlighter:
+    """Splits example sentences into plain and highlighted parts for a set of forms."""
+
+    def __init__(self, terms):
+        search_terms = set()
+        for t in terms:
+            if t:
+                search_terms.add(t)
+                search_terms.add(strip_diacritics(t))
+
+        if len(search_terms) > TRIE_THRESHOLD:
+            alternation = trie_pattern(search_terms)
+        else:
+            sorted_terms = sorted(search_terms, key=len, reverse=True)
+            alternation = "|".join(re.escape(t) for t in sorted_terms)
+
+        self.pattern = re.compile(rf"\b({alternation})\b", re.IGNORECASE)
+        self.lookup_set = {strip_diacritics(t).lower() for t in terms}
+
+    def split(self, text):
+        """(part, highlighted) for each non-empty part of text."""
+        for part in self.pattern.split(text):
+            if part:
+                yield part, strip_diacritics(part).lower() in self.lookup_set
+
+
+@lru_cache(maxsize=4096)
+def get_highlighter(terms):
+    """Highlighter for a frozenset of forms, compiled once and reused."""
+    return Highlighter(terms)
@@ -0,0 +1,123 @@
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return round(maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+class Instrument:
+    """Per-stage wall time, CPU time, peak memory and item counts.
+
+    Wrap each section of a script in stage(); the yielded dict can take an
+    "items" count. summary() lists the stages in the order they started.
+    With profile_dir, each outermost stage also writes <name>.pstats there;
+    with trace_memory, tracemalloc records the Python heap peak of every stage
+    (this slows the stage down noticeably).
+    """
+
+    def __init__(self, script, stats_path=None, profile_dir=None, trace_memory=False):
+        self.script = script
+        self.stats_path = stats_path
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._depth = 0
+        self._profiling = False
+        self._peaks = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, items=None):
+        record = {"stage": name, "depth": self._depth, "items": items}
+        self.stages.append(record)
+        profiler = None
+        if self.profile_dir and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+        if self.trace_memory:
+            # tracemalloc keeps a single peak; fold it into the enclosing stage before resetting
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            self._peaks.append(0)
+            tracemalloc.reset_peak()
+
+        self._depth += 1
+        start_times = os.times()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            end_times = os.times()
+            self._depth -= 1
+
+            record["seconds"] = round(seconds, 3)
+            record["cpu_seconds"] = round(end_times.user + end_times.system - start_times.user - start_times.system, 3)
+            children = end_times.children_user + end_times.children_system - start_times.children_user - start_times.children_system
+            if children:
+                record["child_cpu_seconds"] = round(children, 3)
+            record["max_rss_mb"] = max_rss_mb()
+            if self.trace_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], self._peaks.pop())
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                record["tracemalloc_peak_mb"] = round(peak / (1 << 20), 1)
+            if profiler:
+                self._profiling = False
+                os.makedirs(self.profile_dir, exist_ok=True)
+                filename = re.sub(r"[^\w.-]+", "_", f"{self.script}-{name}") + ".pstats"
+                record["profile"] = os.path.join(self.profile_dir, filename)
+                profiler.dump_stats(record["profile"])
+
+    def summary(self):
+        return {
+            "script": self.script,
+            "seconds": round(sum(s["seconds"] for s in self.stages if s["depth"] == 0), 3),
+            "max_rss_mb": max_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def report(self):
+        """Prints the stage table, and writes the JSON summary if a stats path was given."""
+        print(f"Stages ({self.script}):")
+        for s in self.stages:
+            items = "" if s["items"] is None else f"{s['items']:>10} items"
+            name = "  " * s["depth"] + s["stage"]
+            print(f"  {name:<30}{s['seconds']:>9.3f}s  cpu {s['cpu_seconds']:>8.3f}s  {s['max_rss_mb'] or 0:>8.1f} MB  {items}")
+        if self.stats_path:
+            os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+            with open(self.stats_path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, indent=2)
+            print(f"Stage summary written to {self.stats_path}")
+
+
+def add_arguments(parser):
+    parser.add_argument("--stats", default=None, help="write a JSON summary of every stage to this file")
+    parser.add_argument("--profile-dir", default=None, help="write a cProfile .pstats file per stage into this folder")
+    parser.add_argument("--tracemalloc", action="store_true", help="also record the Python heap peak of each stage")
+
+
+def from_args(script, args):
+    return Instrument(script, args.stats, args.profile_dir, args.tracemalloc)
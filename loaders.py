@@ -0,0 +1,303 @@
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+from normalize import accent_column
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+
+RUSSIAN3_DIR = "russian3"
+RELATIONS = ("related", "synonym", "antonym")
+SENTENCES_PER_WORD = 10
+# Target languages of russian3: translations.lang values with usage_<lang> and tl_<lang> columns
+LANGS = ("en", "de")
+# What relateds and expressions show for an id that is not in words.csv (e.g. -1)
+NO_DESCRIPTION = ["", ""]
+# pd.read_csv's default NaN strings, so both parsers agree on what is missing
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+STRING_DTYPES = ("string", "category", "str")
+
+
+def read_csv(path, usecols=None, dtype=None, where=None):
+    """pd.read_csv, parsed by pyarrow's multithreaded reader when it is installed.
+
+    dtype is applied as the table is converted, so "category" columns never
+    exist as full strings in pandas. where={column: values} keeps only the rows
+    with one of those values; they are filtered on the Arrow table (or per
+    chunk with pandas' own parser) before the rest of the file becomes a
+    DataFrame.
+    """
+    dtype = dtype or {}
+    if pa is None:
+        if not where:
+            return pd.read_csv(path, usecols=usecols, dtype=dtype)
+        chunks = []
+        for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=1 << 16):
+            for column, values in where.items():
+                chunk = chunk[chunk[column].isin(values)]
+            chunks.append(chunk)
+        # Chunks may end up with different categories
+        return pd.concat(chunks, ignore_index=True).astype(dtype)
+
+    if usecols is not None:
+        # In file order, as pd.read_csv returns them
+        # utf-8-sig: a BOM must not stick to the first column name
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            usecols = [c for c in next(csv.reader(f)) if c in usecols]
+    column_types = {c: pa.string() for c, t in dtype.items() if str(t) in STRING_DTYPES}
+    table = pa_csv.read_csv(
+        path,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols, column_types=column_types, null_values=NA_VALUES, strings_can_be_null=True,
+        ),
+    )
+    for column, values in (where or {}).items():
+        table = table.filter(pc.is_in(table[column], value_set=pa.array(list(values))))
+    categories = [c for c, t in dtype.items() if str(t) == "category"]
+    df = table.to_pandas(categories=categories, split_blocks=True, self_destruct=True)
+    del table
+    # Arrow's allocator keeps freed buffers for reuse; the rest of the build is plain Python
+    pa.default_memory_pool().release_unused()
+    rest = {c: t for c, t in dtype.items() if c not in categories}
+    return df.astype(rest) if rest else df
+
+
+def russian3_csv(name, folder=RUSSIAN3_DIR):
+    return os.path.join(folder, f"russian3 - {name}.csv")
+
+
+def check_space(column):
+    print(column.str.contains(" $").sum())
+    print(column.str.contains("^ ").sum())
+
+
+# 有些词竟然还有多余的空格……
+def strip_space(column):
+    print("Check Space:")
+    check_space(column)
+    column = column.str.strip()
+    print("After strip()")
+    check_space(column)
+    return column
+
+
+def load_words(path):
+    usage = [f"usage_{lang}" for lang in LANGS]
+    words = read_csv(path, usecols=["id", "bare", "accented", "derived_from_word_id", "rank", "disabled", *usage, "type"],
+                     dtype={"bare": "string", "accented": "string", **{c: "string" for c in usage}, "type": "category"})
+    words["bare"] = strip_space(words["bare"])
+    words["accented"] = strip_space(words["accented"])
+
+    words["derived_from_word_id"] = words["derived_from_word_id"].fillna(-1)
+    words["rank"] = words["rank"].fillna(-1)
+    words["accented"] = accent_column(words["accented"])
+    for c in usage:
+        words[c] = words[c].fillna("")
+        words[c] = words[c].replace("\\\\n", "\\n", regex=True)
+    dtype = {"id": "int", "bare": "string", "accented": "string", "derived_from_word_id": "int", "rank": "int", "disabled": "int", **{c: "string" for c in usage}, "type": "category"}
+    return words.astype(dtype)
+
+
+def load_words_forms(path):
+    words_forms_csv = read_csv(path, usecols=["word_id", "form_type", "form"], dtype={"form_type": "category", "form": "string"})
+    words_forms_csv["form"] = words_forms_csv["form"].fillna("")
+    words_forms_csv["form"] = strip_space(words_forms_csv["form"])
+
+    # 有些词竟然还有多余的括号……
+    print("Check Parentheses:")
+    print(words_forms_csv["form"].str.contains("\\)").sum())
+    print(words_forms_csv["form"].str.contains("\\(").sum())
+
+    print("After strip()")
+    words_forms_csv["form"] = words_forms_csv["form"].str.strip("()")
+    print(words_forms_csv["form"].str.contains("\\)").sum())
+    print(words_forms_csv["form"].str.contains("\\(").sum())
+
+    words_forms_csv["form"] = accent_column(words_forms_csv["form"])
+    dtype = {"word_id": "int", "form_type": "category", "form": "string"}
+    return words_forms_csv.astype(dtype)
+
+
+def load_words_rels(path):
+    words_rels_csv = read_csv(path, usecols=["word_id", "rel_word_id", "relation"], dtype={"relation": "category"})
+    dtype = {"word_id": "int", "rel_word_id": "int", "relation": "category"}
+    return words_rels_csv.astype(dtype)
+
+
+def load_nouns(path):
+    nouns_csv = read_csv(path, dtype={"gender": "string", "partner": "string"})
+    # both->b
+    nouns_csv["gender"] = nouns_csv["gender"].map({"f": "f", "m": "m", "n": "n", "pl": "pl", "both": "b"})
+    nouns_csv["gender"] = nouns_csv["gender"].fillna("")
+    nouns_csv["partner"] = nouns_csv["partner"].fillna("")
+    nouns_csv["partner"] = accent_column(nouns_csv["partner"])
+    nouns_csv["animate"] = nouns_csv["animate"].fillna(0)
+    nouns_csv["indeclinable"] = nouns_csv["indeclinable"].fillna(0)
+    nouns_csv["sg_only"] = nouns_csv["sg_only"].fillna(0)
+    nouns_csv["pl_only"] = nouns_csv["pl_only"].fillna(0)
+    dtype = {"word_id": "int", "gender": "category", "partner": "string", "animate": "bool", "indeclinable": "bool", "sg_only": "bool", "pl_only": "bool"}
+    return nouns_csv.astype(dtype)
+
+
+def load_verbs(path):
+    verbs_csv = read_csv(path, usecols=["word_id", "aspect", "partner"], dtype={"aspect": "string", "partner": "string"})
+    # imperfective->i, perfective->p, both->b
+    verbs_csv["aspect"] = verbs_csv["aspect"].map({"imperfective": "i", "perfective": "p", "both": "b"})
+    verbs_csv["aspect"] = verbs_csv["aspect"].fillna("")
+    verbs_csv["partner"] = verbs_csv["partner"].fillna("")
+    verbs_csv["partner"] = accent_column(verbs_csv["partner"]).str.replace(";", ", ", regex=False)
+    dtype = {"word_id": "int", "aspect": "category", "partner": "string"}
+    return verbs_csv.astype(dtype)
+
+
+def load_expressions_words(path):
+    expressions_words_csv = read_csv(path, usecols=["expression_id", "referenced_word_id"])
+    dtype = {"expression_id": "int", "referenced_word_id": "int"}
+    return expressions_words_csv.astype(dtype)
+
+
+def load_translations(path):
+    # 只留LANGS的翻译
+    translations_csv = read_csv(
+        path, usecols=["word_id", "lang", "tl", "example_ru", "example_tl", "info"],
+        dtype={"lang": "category", "tl": "string", "example_ru": "string", "example_tl": "string", "info": "string"},
+        where={"lang": LANGS},
+    )
+    translations_csv["example_ru"] = translations_csv["example_ru"].fillna("")
+    translations_csv["example_ru"] = accent_column(translations_csv["example_ru"])
+    translations_csv["example_tl"] = translations_csv["example_tl"].fillna("")
+    translations_csv["info"] = translations_csv["info"].fillna("")
+    dtype = {"word_id": "int", "lang": "category", "tl": "string", "example_ru": "string", "example_tl": "string", "info": "string"}
+    return translations_csv.astype(dtype)
+
+
+def load_sentences_translations(path):
+    tl = [f"tl_{lang}" for lang in LANGS]
+    sentences_translations_csv = read_csv(path, usecols=["sentence_id", *tl], dtype={c: "string" for c in tl})
+    # Sentences translated into at least one of LANGS
+    sentences_translations_csv = sentences_translations_csv[sentences_translations_csv[tl].notna().any(axis=1)]
+    dtype = {"sentence_id": "int", **{c: "string" for c in tl}}
+    return sentences_translations_csv.astype(dtype)
+
+
+def load_sentences(path):
+    sentences_csv = read_csv(path, usecols=["id", "ru"], dtype={"ru": "string"})
+    dtype = {"id": "int", "ru": "string"}
+    sentences_csv = sentences_csv.astype(dtype)
+    sentences_csv["ru"] = accent_column(sentences_csv["ru"])
+    return sentences_csv
+
+
+def load_sentences_words(path):
+    sentences_words_csv = read_csv(path, usecols=["sentence_id", "word_id"])
+    dtype = {"sentence_id": "int", "word_id": "int"}
+    return sentences_words_csv.astype(dtype)
+
+
+def group_positions(keys):
+    """Row positions of each key, keys in order of first appearance."""
+    codes, uniques = pd.factorize(keys)
+    if len(codes) == 0:
+        # np.split would still yield one empty chunk
+        return [], []
+    order = np.argsort(codes, kind="stable")
+    bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+    return uniques.tolist(), np.split(order, bounds)
+
+
+def build_rels_dict(words_rels_csv):
+    word_id = words_rels_csv["word_id"].to_numpy()
+    rel_word_id = words_rels_csv["rel_word_id"].to_numpy()
+    relation = words_rels_csv["relation"].to_numpy(dtype=object)
+
+    # Both directions, interleaved in the order the row loop used to visit them
+    pairs = pd.DataFrame({
+        "word_id": np.column_stack([word_id, rel_word_id]).ravel(),
+        "rel_word_id": np.column_stack([rel_word_id, word_id]).ravel(),
+        "relation": np.repeat(relation, 2),
+    })
+    pairs = pairs.drop_duplicates(ignore_index=True)
+
+    words_rels_csv_dict = {}
+    keys, positions = group_positions(pairs["word_id"].to_numpy())
+    rel_word_ids = pairs["rel_word_id"].to_numpy()
+    relations = pairs["relation"].to_numpy()
+    for word_id, idx in zip(keys, positions):
+        relateds = {k: [] for k in RELATIONS}
+        for rel, rel_id in zip(relations[idx].tolist(), rel_word_ids[idx].tolist()):
+            relateds[rel].append(rel_id)
+        words_rels_csv_dict[word_id] = relateds
+    return words_rels_csv_dict
+
+
+def build_descriptions(accented, translation_strs):
+    """word_id -> [accented, translation string], the pair shown for a linked word.
+
+    Built once per id; relateds, expressions and derived_from_word all read
+    (and share) the same lists, so they must not be modified.
+    """
+    descriptions = {word_id: [text, translation_strs.get(word_id, "")] for word_id, text in accented.items()}
+    for word_id, text in translation_strs.items():
+        descriptions.setdefault(word_id, ["", text])
+    return descriptions
+
+
+def build_expression_index(expressions_words_csv):
+    """Two-way expression<->word index.
+
+    Returns (expressions_by_word, words_by_expression), each mapping an id to
+    the list of linked ids in CSV order.
+    """
+    def build(keys, values):
+        group_keys, positions = group_positions(keys)
+        return {key: values[idx].tolist() for key, idx in zip(group_keys, positions)}
+
+    expression_ids = expressions_words_csv["expression_id"].to_numpy()
+    referenced_word_ids = expressions_words_csv["referenced_word_id"].to_numpy()
+    expressions_by_word = build(referenced_word_ids, expression_ids)
+    words_by_expression = build(expression_ids, referenced_word_ids)
+    return expressions_by_word, words_by_expression
+
+
+def mix64(x):
+    """splitmix64 finalizer, applied in place to the uint64 array x."""
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def sample_sentences(sentences_words_csv, limit=SENTENCES_PER_WORD, seed=0):
+    """Up to limit (word_id, sentence_id) rows per word, picked by a seeded hash.
+
+    Every link is ranked by a hash of (seed, word_id, sentence_id) and each
+    word keeps its lowest-ranked links, in rank order. The pick depends only on
+    the seed and the links themselves, not on row order, so the same input
+    always gives the same dictionary.
+    """
+    word_ids = sentences_words_csv["word_id"].to_numpy().astype(np.uint64)
+    rank = mix64(word_ids ^ np.uint64(seed & 0xFFFFFFFFFFFFFFFF))
+    rank ^= sentences_words_csv["sentence_id"].to_numpy().astype(np.uint64)
+    mix64(rank)
+
+    order = np.lexsort((rank, word_ids))
+    sorted_word_ids = word_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_word_ids[1:] != sorted_word_ids[:-1]])
+    # Position of every row within its word's group
+    within = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    keep = order[within < limit]
+    return sentences_words_csv[["word_id", "sentence_id"]].iloc[keep].reset_index(drop=True)
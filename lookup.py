@@ -0,0 +1,234 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import time
+import zipfile
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from banks import encode_row
+from normalize import strip_diacritics
+from package import BANK_NAME
+
+
+MODES = ("exact", "folded", "prefix")
+
+
+def fold(term):
+    return strip_diacritics(term).lower()
+
+
+def iter_banks(source):
+    """(kind, rows) for every bank in a folder or a dictionary ZIP, kind being term or term_meta."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for name in sorted(archive.namelist(), key=bank_order):
+                match = BANK_NAME.fullmatch(name)
+                if match:
+                    yield match.group(1), json.loads(archive.read(name))
+        return
+    for name in sorted(os.listdir(source), key=bank_order):
+        match = BANK_NAME.fullmatch(name)
+        if match:
+            with open(os.path.join(source, name), "r", encoding="utf-8") as f:
+                yield match.group(1), json.load(f)
+
+
+def bank_order(name):
+    match = BANK_NAME.fullmatch(name)
+    return (match.group(1), int(match.group(2))) if match else (name, 0)
+
+
+class TermIndex:
+    """In-memory index over term and term meta banks.
+
+    Rows are kept as their compact JSON encoding and only decoded when a
+    lookup renders them. exact and folded map a term (or its lowercase form
+    without stress marks, see normalize.strip_diacritics) to row numbers;
+    prefix lookups bisect the sorted folded keys, which is the flattened
+    form of a prefix trie.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.rows = []
+        self.exact = {}
+        self.folded = {}
+        self.meta = {}
+        self.prefix_keys = []
+        self.render = lru_cache(maxsize=cache_size)(self._render)
+
+    def add_term_rows(self, rows):
+        for row in rows:
+            row_id = len(self.rows)
+            self.rows.append(encode_row(row))
+            self.exact.setdefault(row[0], []).append(row_id)
+            self.folded.setdefault(fold(row[0]), []).append(row_id)
+
+    def add_meta_rows(self, rows):
+        for term, mode, data in rows:
+            self.meta.setdefault(term, []).append(encode_row([mode, data]))
+
+    def load(self, source):
+        for kind, rows in iter_banks(source):
+            if kind == "term":
+                self.add_term_rows(rows)
+            elif kind == "term_meta":
+                self.add_meta_rows(rows)
+        self.prefix_keys = sorted(self.folded)
+        self.render.cache_clear()
+
+    def match(self, query, mode="exact", limit=20):
+        """Row numbers matching query, in bank order for each matched key."""
+        if mode == "exact":
+            return self.exact.get(query, [])[:limit]
+        key = fold(query)
+        if mode == "folded":
+            return self.folded.get(key, [])[:limit]
+        if mode != "prefix":
+            raise ValueError(f"Unknown lookup mode: {mode}")
+
+        row_ids = []
+        i = bisect.bisect_left(self.prefix_keys, key)
+        while i < len(self.prefix_keys) and self.prefix_keys[i].startswith(key) and len(row_ids) < limit:
+            row_ids.extend(self.folded[self.prefix_keys[i]])
+            i += 1
+        return row_ids[:limit]
+
+    def entry(self, row_id):
+        term, reading, tags, rules, score, definitions, sequence, term_tags = json.loads(self.rows[row_id])
+        return {
+            "term": term,
+            "reading": reading,
+            "tags": tags,
+            "definitions": definitions,
+            "meta": [json.loads(m) for m in self.meta.get(term, [])],
+        }
+
+    def _render(self, query, mode, limit):
+        results = []
+        for row_id in self.match(query, mode, limit):
+            entry = self.entry(row_id)
+            if entry["tags"] == "non-lemma":
+                # Non-lemma rows point back at their lemma: [[lemma, [rule, ...]], ...], one
+                # deinflection (a chain of rules) per form type; each lemma is listed once, with the
+                # rule chains of all its deinflections
+                chains = {}
+                for lemma, rules in entry.pop("definitions"):
+                    chains.setdefault(lemma, []).append(rules)
+                entry["lemmas"] = [
+                    {
+                        "lemma": lemma,
+                        "rules": rules,
+                        "entries": [e for e in map(self.entry, self.exact.get(lemma, [])) if e["tags"] != "non-lemma"],
+                    }
+                    for lemma, rules in chains.items()
+                ]
+            results.append(entry)
+        return json.dumps({"query": query, "mode": mode, "results": results}, ensure_ascii=False)
+
+    def lookup(self, query, mode="exact", limit=20):
+        return json.loads(self.render(query, mode, limit))
+
+
+def load_index(sources, cache_size=4096):
+    start = time.perf_counter()
+    index = TermIndex(cache_size)
+    for source in sources:
+        index.load(source)
+    seconds = time.perf_counter() - start
+    print(f"Loaded {len(index.rows)} rows, {len(index.exact)} terms, {len(index.meta)} meta terms in {seconds:.3f}s")
+    return index, seconds
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def measure(index, queries, mode):
+    """Latencies in ms of render() over queries: first with a cleared cache, then warm."""
+    index.render.cache_clear()
+    report = {}
+    for label in ("cold", "warm"):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.render(query, mode, 20)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        report[label] = {"p50_ms": round(percentile(latencies, 0.5), 4), "p99_ms": round(percentile(latencies, 0.99), 4)}
+    return report
+
+
+def benchmark(index, startup_seconds, count, seed):
+    rng = random.Random(seed)
+    terms = list(index.exact)
+    sample = [rng.choice(terms) for _ in range(count)] if terms else []
+    queries = {
+        "exact": sample,
+        "folded": [t.upper() for t in sample],
+        "prefix": [fold(t)[:max(1, len(t) // 2)] for t in sample],
+    }
+    report = {"startup_seconds": round(startup_seconds, 3), "rows": len(index.rows), "queries": len(sample), "modes": {}}
+    for mode in MODES:
+        report["modes"][mode] = measure(index, queries[mode], mode)
+    return report
+
+
+def make_handler(index):
+    class LookupHandler(BaseHTTPRequestHandler):
+        # GET /lookup?q=<term>&mode=exact|folded|prefix&limit=20
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path != "/lookup" or "q" not in params:
+                self.send_error(404, "Use /lookup?q=<term>&mode=exact|folded|prefix")
+                return
+            mode = params.get("mode", ["exact"])[0]
+            if mode not in MODES:
+                self.send_error(400, f"mode must be one of {', '.join(MODES)}")
+                return
+            limit = params.get("limit", ["20"])[0]
+            if not limit.isdecimal() or int(limit) <= 0:
+                self.send_error(400, "limit must be a positive integer")
+                return
+            body = index.render(params["q"][0], mode, int(limit)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return LookupHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up terms in built term / term meta banks.")
+    parser.add_argument("sources", nargs="*", default=["dict/opr"], help="bank folders or dictionary ZIPs")
+    parser.add_argument("-q", "--query", action="append", default=[], help="print the results for this term")
+    parser.add_argument("--mode", choices=MODES, default="exact")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--cache-size", type=int, default=4096, help="rendered results kept in the LRU cache")
+    parser.add_argument("--serve", action="store_true", help="answer GET /lookup?q=... over HTTP")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bench", type=int, metavar="N", help="report p50/p99 latency over N sampled terms per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index, startup_seconds = load_index(args.sources, args.cache_size)
+
+    for query in args.query:
+        print(json.dumps(index.lookup(query, args.mode, args.limit), ensure_ascii=False, indent=2))
+
+    if args.bench:
+        print(json.dumps(benchmark(index, startup_seconds, args.bench, args.seed), indent=2))
+
+    if args.serve:
+        server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(index))
+        print(f"Serving on http://127.0.0.1:{args.port}/lookup?q=")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,244 @@
+import pandas as pd
+
+from instrument import Instrument
+from loaders import *
+from records import GroupedTable, RecordTable, word_records
+
+
+def show_na_column(df):
+    print("NaN:", [i for i in list(df.isnull().sum().items()) if i[1]])
+
+
+def show_word_stats(words):
+    not_nan_list = words[~pd.isna(words["type"])]
+    print("Total Not NaN:", len(not_nan_list))
+    print("Total Not NaN (not disabled):", len(not_nan_list[not_nan_list["disabled"] == 0]))
+    print("Total Not NaN (disabled):", len(not_nan_list[not_nan_list["disabled"] == 1]))
+    not_nan_list = not_nan_list[not_nan_list["disabled"] == 1]
+    print("Has Usage (disabled):", len(not_nan_list[not_nan_list["usage_en"].isna() == False]))
+    del not_nan_list
+
+    print()
+    nan_list = words[pd.isna(words["type"])]
+    print("Total NaN:", len(nan_list))
+    print("Total NaN (not disabled):", len(nan_list[nan_list["disabled"] == 0]))
+    print("Total NaN (disabled):", len(nan_list[nan_list["disabled"] == 1]))
+    nan_list = nan_list[nan_list["disabled"] == 0]
+    print("Has Usage (not disabled):", len(nan_list[nan_list["usage_en"].isna() == False]))
+    del nan_list
+
+
+def load_table(snapshots, stats, name, loader):
+    with stats.stage(f"load:{name}") as stage:
+        df = snapshots.load(russian3_csv(name), loader)
+        stage["items"] = len(df)
+    return df
+
+
+def load_sentence_tables(snapshots, stats):
+    """Sentences, their translations and word links, restricted to translated sentences."""
+    sentences_translations_csv = load_table(snapshots, stats, "sentences_translations", load_sentences_translations)
+    sentences_translations_csv.info()
+    show_na_column(sentences_translations_csv)
+
+    sentences_csv = load_table(snapshots, stats, "sentences", load_sentences)
+    # 剔除没有翻译的
+    sentences_csv = sentences_csv[sentences_csv["id"].isin(sentences_translations_csv["sentence_id"])]
+    sentences_csv.info()
+    show_na_column(sentences_csv)
+
+    sentences_words_csv = load_table(snapshots, stats, "sentences_words", load_sentences_words)
+    # 剔除没有翻译的
+    sentences_words_csv = sentences_words_csv[sentences_words_csv["sentence_id"].isin(sentences_translations_csv["sentence_id"])]
+    sentences_words_csv.info(show_counts=True)
+    show_na_column(sentences_words_csv)
+
+    return sentences_csv, sentences_translations_csv, sentences_words_csv
+
+
+class RussianTables:
+    """The language-independent part of the russian3 dataset.
+
+    Shared by the MemoryStore of every target language of a build.
+    """
+
+    def __init__(self, selected, forms, words_rels_csv_dict, nouns, verbs, sentence_ru, expressions_words_csv):
+        self.selected = selected
+        self.forms = forms
+        self.words_rels_csv_dict = words_rels_csv_dict
+        self.nouns = nouns
+        self.verbs = verbs
+        self.sentence_ru = sentence_ru
+        self.expressions_by_word, self.words_by_expression = build_expression_index(expressions_words_csv)
+
+
+class MemoryStore:
+    """The russian3 dataset held in memory for one target language, see load_memory_store.
+
+    Tables are kept column-wise (see records.py) and each word's forms,
+    translations and sentences are rebuilt in the entry shape when asked for.
+    """
+
+    def __init__(self, tables, lang, descriptions, usage, translations, sampled_sentences, sentence_tl):
+        self.tables = tables
+        self.lang = lang
+        self.descriptions = descriptions
+        self.usage = usage
+        self.translations = translations
+        self.sampled_sentences = sampled_sentences
+        self.sentence_tl = sentence_tl
+
+    def selected(self):
+        return self.tables.selected
+
+    def prefetch(self, batch):
+        pass
+
+    def describe(self, word_id: int):
+        return self.descriptions.get(word_id, NO_DESCRIPTION)
+
+    def get_accented(self, word_id: int):
+        return self.describe(word_id)[0]
+
+    def get_usage(self, word_id: int):
+        return self.usage.get(word_id, "")
+
+    def get_extra_info(self, word_id: int, Type: str):
+        info = {}
+        if Type == "noun":
+            info = self.tables.nouns.get(word_id)
+        elif Type == "verb":
+            info = self.tables.verbs.get(word_id)
+        return info
+
+    def get_translations(self, word_id: int):
+        return self.translations.rows(word_id)
+
+    def get_translation_str(self, word_id: int):
+        return self.describe(word_id)[1]
+
+    def get_expressions(self, word_id: int, Type: str):
+        # 若查的是单词，则返回expression列表
+        if Type != "expression":
+            return [self.describe(i) for i in self.tables.expressions_by_word.get(word_id, [])]
+        # 若查的是expression，返回单词的列表
+        else:
+            return [self.describe(i) for i in self.tables.words_by_expression.get(word_id, [])]
+
+    def get_sentences(self, word_id: int):
+        sentence_ru = self.tables.sentence_ru
+        return [[sentence_ru[i], self.sentence_tl[i]] for i in self.sampled_sentences.column(word_id, "sentence_id")]
+
+    def get_forms(self, word_id: int):
+        # Multiple forms of one form_type are joined with ", "
+        forms_dict = {}
+        for form_type, form in self.tables.forms.rows(word_id):
+            forms_dict[form_type] = form if form_type not in forms_dict else forms_dict[form_type] + ", " + form
+        return forms_dict
+
+    def get_relateds(self, word_id: int):
+        relateds_word = self.tables.words_rels_csv_dict.get(word_id, {k: [] for k in RELATIONS})
+        return {k: [self.describe(v) for v in relateds_word[k]] for k in relateds_word}
+
+
+def load_memory_store(snapshots, stats=None, sentence_limit=SENTENCES_PER_WORD, seed=0, langs=("en",)):
+    """Loads russian3 once and returns {lang: MemoryStore} for each of langs."""
+    stats = stats or Instrument("memory_store")
+    words = load_table(snapshots, stats, "words", load_words)
+    words.info()
+    show_na_column(words)
+    show_word_stats(words)
+
+    # Disabled的词、type为NaN的词，将没有主页面，但是可以被relate到
+    with stats.stage("build:words") as stage:
+        selected_words = words[~pd.isna(words["type"]) & (words["disabled"] == 0)]
+        selected_words.info()
+        show_na_column(selected_words)
+        selected = word_records(selected_words)
+        accented = dict(zip(words["id"].tolist(), words["accented"].tolist()))
+        usage = {}
+        for lang in langs:
+            usage[lang] = {k: v for k, v in zip(selected_words["id"].tolist(), selected_words[f"usage_{lang}"].tolist()) if v}
+        stage["items"] = len(selected)
+    del words, selected_words
+
+    words_forms_csv = load_table(snapshots, stats, "words_forms", load_words_forms)
+    words_forms_csv.info(show_counts=True)
+    show_na_column(words_forms_csv)
+
+    print("Builing Word Form Dict...")
+    with stats.stage("build:forms") as stage:
+        forms = GroupedTable(words_forms_csv, "word_id", ["form_type", "form"])
+        stage["items"] = len(forms)
+    del words_forms_csv
+
+    words_rels_csv = load_table(snapshots, stats, "words_rels", load_words_rels)
+    words_rels_csv.info()
+    show_na_column(words_rels_csv)
+
+    print("Builing Word Relation Dict...")
+    with stats.stage("build:relations") as stage:
+        words_rels_csv_dict = build_rels_dict(words_rels_csv)
+        stage["items"] = len(words_rels_csv_dict)
+    del words_rels_csv
+
+    nouns_csv = load_table(snapshots, stats, "nouns", load_nouns)
+    nouns_csv.info()
+    show_na_column(nouns_csv)
+    nouns = RecordTable(nouns_csv, "word_id")
+    del nouns_csv
+
+    verbs_csv = load_table(snapshots, stats, "verbs", load_verbs)
+    verbs_csv.info()
+    show_na_column(verbs_csv)
+    verbs = RecordTable(verbs_csv, "word_id")
+    del verbs_csv
+
+    expressions_words_csv = load_table(snapshots, stats, "expressions_words", load_expressions_words)
+    expressions_words_csv.info()
+    show_na_column(expressions_words_csv)
+
+    translations_csv = load_table(snapshots, stats, "translations", load_translations)
+    translations_csv.info()
+    show_na_column(translations_csv)
+
+    print("Builing Word Translation Dict...")
+    translations = {}
+    descriptions = {}
+    for lang in langs:
+        with stats.stage(f"build:translations:{lang}") as stage:
+            translations[lang] = GroupedTable(
+                translations_csv[translations_csv["lang"] == lang], "word_id", ["tl", "example_ru", "example_tl", "info"],
+            )
+            stage["items"] = len(translations[lang])
+        with stats.stage(f"build:descriptions:{lang}") as stage:
+            descriptions[lang] = build_descriptions(accented, translations[lang].joined("tl", "; "))
+            stage["items"] = len(descriptions[lang])
+    del translations_csv, accented
+
+    sentences_csv, sentences_translations_csv, sentences_words_csv = load_sentence_tables(snapshots, stats)
+    print("Builing Sentence Dict...")
+    sampled_sentences = {}
+    sentence_tl = {}
+    for lang in langs:
+        with stats.stage(f"build:sentences:{lang}") as stage:
+            translated = sentences_translations_csv[sentences_translations_csv[f"tl_{lang}"].notna()]
+            sampled = sample_sentences(
+                sentences_words_csv[sentences_words_csv["sentence_id"].isin(translated["sentence_id"])], sentence_limit, seed,
+            )
+            sampled_sentences[lang] = GroupedTable(sampled, "word_id", ["sentence_id"])
+            sentence_tl[lang] = dict(zip(translated["sentence_id"].tolist(), translated[f"tl_{lang}"].tolist()))
+            stage["items"] = len(sampled_sentences[lang])
+        del translated, sampled
+    with stats.stage("build:sentences") as stage:
+        sentence_ru = dict(zip(sentences_csv["id"].tolist(), sentences_csv["ru"].tolist()))
+        stage["items"] = len(sentence_ru)
+    del sentences_csv, sentences_translations_csv, sentences_words_csv
+
+    with stats.stage("build:expressions") as stage:
+        tables = RussianTables(selected, forms, words_rels_csv_dict, nouns, verbs, sentence_ru, expressions_words_csv)
+        stage["items"] = len(tables.expressions_by_word) + len(tables.words_by_expression)
+    return {
+        lang: MemoryStore(tables, lang, descriptions[lang], usage[lang], translations[lang], sampled_sentences[lang], sentence_tl[lang])
+        for lang in langs
+    }
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from utils import remove_diacritics
+
+
+STRESS = chr(769)
+
+# Below this code point (Latin, Greek and Cyrillic, including the combining
+# marks U+0300-U+036F and U+0483-U+0489) a per-character table reproduces
+# remove_diacritics exactly: NFD only decomposes and reorders marks, and all
+# marks are dropped anyway.
+TABLE_LIMIT = "\u0530"
+
+
+def _build_strip_table():
+    table = {}
+    for cp in range(ord(TABLE_LIMIT)):
+        c = chr(cp)
+        stripped = remove_diacritics(c)
+        if stripped != c:
+            table[cp] = stripped or None
+    return table
+
+
+STRIP_TABLE = _build_strip_table()
+
+
+def strip_diacritics(text):
+    """Same result as utils.remove_diacritics, via str.translate where possible."""
+    if not text:
+        return ""
+    if max(text) < TABLE_LIMIT:
+        return text.translate(STRIP_TABLE)
+    return remove_diacritics(text)
+
+
+def accent_column(column):
+    """Vectorized convertStress: ' marks the stressed vowel in russian3."""
+    return column.str.replace("'", STRESS, regex=False)
+
+
+def strip_column(column):
+    stripped = column.str.translate(STRIP_TABLE)
+    slow = column.str.contains(f"[{TABLE_LIMIT}-\\U0010ffff]", regex=True, na=False)
+    if slow.any():
+        stripped[slow] = column[slow].map(remove_diacritics)
+    return stripped
+
+
+def variant_table(strings):
+    """Maps each distinct string to its stripped variant, in one column pass."""
+    column = pd.Series(pd.unique(pd.Series(list(strings), dtype=object)), dtype=object)
+    return dict(zip(column.tolist(), strip_column(column).tolist()))
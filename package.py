@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import re
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+from instrument import Instrument
+
+
+BANK_NAME = re.compile(r"(term|term_meta|kanji|kanji_meta|tag)_bank_(\d+)\.json")
+
+# Every member gets the same timestamp (1980-01-01 00:00, the earliest DOS
+# date) so that two builds of the same data produce the same archive.
+DOS_TIME = 0
+DOS_DATE = (1 << 5) | 1
+UNIX_FILE_ATTR = 0o100644 << 16
+
+
+def default_revision():
+    # Honour SOURCE_DATE_EPOCH for reproducible release builds
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    now = time.gmtime(int(epoch)) if epoch else time.localtime()
+    return time.strftime("%Y.%m.%d", now)
+
+
+def stamp_index(index_file, revision):
+    with open(index_file, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    index["revision"] = revision
+    return json.dumps(index, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def list_banks(bank_folder):
+    banks = []
+    for name in os.listdir(bank_folder):
+        match = BANK_NAME.fullmatch(name)
+        if match:
+            banks.append((match.group(1), int(match.group(2)), name))
+    return [os.path.join(bank_folder, name) for _, _, name in sorted(banks)]
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def deflate(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def write_zip(zip_path, members, jobs=None, level=9):
+    """Writes (name, loader) members to zip_path in the given order.
+
+    loader() returns the member's bytes. Members are read and deflated in a
+    thread pool (zlib releases the GIL) and written sequentially.
+    """
+
+    def compress(member):
+        name, loader = member
+        data = loader()
+        return name, zlib.crc32(data), len(data), deflate(data, level)
+
+    central_dir = []
+    with open(zip_path, "wb") as out, ThreadPoolExecutor(jobs) as pool:
+        for name, crc, size, compressed in pool.map(compress, members):
+            if size > 0xFFFFFFFF or out.tell() > 0xFFFFFFFF:
+                raise ValueError(f"{name} is too large for a non-ZIP64 archive.")
+            encoded_name = name.encode("utf-8")
+            flags = 0 if encoded_name.isascii() else 0x800
+            offset = out.tell()
+            out.write(struct.pack(
+                "<4s2B4HL2L2H", b"PK\003\004", 20, 0, flags, zlib.DEFLATED,
+                DOS_TIME, DOS_DATE, crc, len(compressed), size, len(encoded_name), 0,
+            ))
+            out.write(encoded_name)
+            out.write(compressed)
+            central_dir.append(struct.pack(
+                "<4s4B4HL2L5H2L", b"PK\001\002", 20, 3, 20, 0, flags, zlib.DEFLATED,
+                DOS_TIME, DOS_DATE, crc, len(compressed), size, len(encoded_name),
+                0, 0, 0, 0, UNIX_FILE_ATTR, offset,
+            ) + encoded_name)
+
+        central_dir_offset = out.tell()
+        for header in central_dir:
+            out.write(header)
+        central_dir_size = out.tell() - central_dir_offset
+        out.write(struct.pack(
+            "<4s4H2LH", b"PK\005\006", 0, 0, len(central_dir), len(central_dir),
+            central_dir_size, central_dir_offset, 0,
+        ))
+
+
+def build_package(bank_folder, index_file, zip_path, assets=(), revision=None, jobs=None, level=9, stats=None):
+    """Packs index.json, the assets and every bank in bank_folder into zip_path."""
+    stats = stats or Instrument("package")
+    index = stamp_index(index_file, revision or default_revision())
+
+    members = [("index.json", lambda: index)]
+    names = {"index.json"}
+    for path in list(assets) + list_banks(bank_folder):
+        name = os.path.basename(path)
+        if name not in names:
+            names.add(name)
+            members.append((name, lambda path=path: read_file(path)))
+
+    with stats.stage("zip", items=len(members)):
+        write_zip(zip_path, members, jobs, level)
+    print(f"Packed {len(members)} files into {zip_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack Yomitan banks into a dictionary ZIP.")
+    parser.add_argument("bank_folder")
+    parser.add_argument("index_file", help="index JSON whose revision is stamped into index.json")
+    parser.add_argument("zip_path")
+    parser.add_argument("--asset", action="append", default=[], help="extra file to pack, e.g. styles.css")
+    parser.add_argument("--revision", help="defaults to today (or SOURCE_DATE_EPOCH) as YYYY.MM.DD")
+    parser.add_argument("--jobs", type=int, help="compression threads")
+    parser.add_argument("--level", type=int, default=9, help="zlib compression level")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    stats = instrument.from_args("package", args)
+    build_package(args.bank_folder, args.index_file, args.zip_path, args.asset, args.revision, args.jobs, args.level, stats)
+    stats.report()
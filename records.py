@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from loaders import group_positions
+
+
+def shared_values(column):
+    """column as a list in which equal values are one shared object.
+
+    tolist() makes a new str per row; for columns like form_type, with a few
+    dozen distinct values over a million rows, that is most of their memory.
+    """
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    return np.asarray(uniques.tolist(), dtype=object)[codes].tolist()
+
+
+class WordRecord:
+    """The language-independent columns of one selected word that an entry is built from."""
+
+    __slots__ = ("bare", "accented", "derived_from_word_id", "rank", "type")
+
+    def __init__(self, bare, accented, derived_from_word_id, rank, type):
+        self.bare = bare
+        self.accented = accented
+        self.derived_from_word_id = derived_from_word_id
+        self.rank = rank
+        self.type = type
+
+
+def word_records(words):
+    """(id, WordRecord) pairs for the rows of words, in row order."""
+    columns = [shared_values(words[c]) for c in WordRecord.__slots__]
+    return list(zip(words["id"].tolist(), map(WordRecord, *columns)))
+
+
+class RecordTable:
+    """Rows keyed by a unique column, stored as one list per column.
+
+    get() rebuilds the row as the {column: value} dict that
+    DataFrame.to_dict("index") used to keep for every row.
+    """
+
+    def __init__(self, df, key):
+        self.columns = [c for c in df.columns if c != key]
+        self.values = [shared_values(df[c]) for c in self.columns]
+        self.index = {k: i for i, k in enumerate(df[key].tolist())}
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key):
+        i = self.index.get(key)
+        if i is None:
+            return {}
+        return {c: values[i] for c, values in zip(self.columns, self.values)}
+
+
+class GroupedTable:
+    """Rows grouped by a key column, each group in CSV row order.
+
+    Columns are stored group after group, so a key's rows are the slice
+    offsets[g]:offsets[g + 1] of every column.
+    """
+
+    def __init__(self, df, key, columns):
+        keys, positions = group_positions(df[key].to_numpy())
+        order = np.concatenate(positions) if positions else np.zeros(0, dtype=int)
+        self.columns = list(columns)
+        self.values = [np.asarray(shared_values(df[c]), dtype=object)[order].tolist() for c in self.columns]
+        self.offsets = np.cumsum([0] + [len(p) for p in positions]).tolist()
+        self.index = {k: g for g, k in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def _bounds(self, key):
+        g = self.index.get(key)
+        return (0, 0) if g is None else (self.offsets[g], self.offsets[g + 1])
+
+    def rows(self, key):
+        """The key's rows as lists of column values."""
+        start, end = self._bounds(key)
+        return [list(row) for row in zip(*(values[start:end] for values in self.values))]
+
+    def joined(self, column, sep):
+        """{key: sep.join(the key's values of column)} for every key."""
+        values = self.values[self.columns.index(column)]
+        offsets = self.offsets
+        return {k: sep.join(values[offsets[g]:offsets[g + 1]]) for k, g in self.index.items()}
+
+    def column(self, key, column):
+        start, end = self._bounds(key)
+        return self.values[self.columns.index(column)][start:end]
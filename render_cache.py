@@ -0,0 +1,125 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+
+
+CACHE_PATH = ".cache/term_bank.sqlite"
+# Bump when a change outside the hashed modules alters the rendered rows
+RENDER_VERSION = 1
+
+
+def lang_cache_path(lang):
+    # Every target language keeps its own cache, so builds of several languages do not evict each other
+    return CACHE_PATH if lang == "en" else CACHE_PATH.replace(".sqlite", f".{lang}.sqlite")
+
+
+def render_salt(props, modules):
+    """Hash of the props/*.json values, the source of the rendering modules and RENDER_VERSION."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(props, ensure_ascii=False, sort_keys=True).encode())
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+    digest.update(str(RENDER_VERSION).encode())
+    return digest.digest()
+
+
+class RenderCache:
+    """Persistent cache of each lemma's encoded term bank rows.
+
+    A lemma's rows are stored with the digest of its dict.bin record and the
+    render salt, so it is rendered again only when its record, the props or
+    the rendering code changed. close() evicts the lemmas that were not
+    looked at, i.e. those gone from the dictionary.
+    """
+
+    def __init__(self, path=CACHE_PATH, salt=b"", enabled=True):
+        self.path = path
+        self.salt = salt
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.seen = set()
+        self.digests = {}
+        self.conn = None
+        if enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS renders (lemma TEXT PRIMARY KEY, digest BLOB, rows TEXT)")
+            self.digests = dict(self.conn.execute("SELECT lemma, digest FROM renders"))
+
+    def digest(self, record):
+        if not self.enabled:
+            return None
+        return hashlib.blake2b(record, digest_size=16, key=self.salt[:64]).digest()
+
+    def check(self, lemma, digest):
+        """Whether the cached rows of lemma are still valid for this digest."""
+        self.seen.add(lemma)
+        fresh = self.enabled and self.digests.get(lemma) == digest
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def fetch(self, lemmas):
+        """{lemma: [encoded row, ...]} for lemmas that check() found fresh."""
+        rows = {}
+        for i in range(0, len(lemmas), 500):
+            chunk = lemmas[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for lemma, text in self.conn.execute(f"SELECT lemma, rows FROM renders WHERE lemma IN ({marks})", chunk):
+                # Encoded rows are compact JSON, which never contains a raw newline
+                rows[lemma] = text.split("\n") if text else []
+        return rows
+
+    def store(self, rendered):
+        """Saves (lemma, digest, [encoded row, ...]) triples."""
+        if self.enabled and rendered:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO renders VALUES (?, ?, ?)",
+                [(lemma, digest, "\n".join(rows)) for lemma, digest, rows in rendered],
+            )
+
+    def close(self):
+        if not self.enabled:
+            return
+        stale = [(lemma,) for lemma in self.digests if lemma not in self.seen]
+        self.conn.executemany("DELETE FROM renders WHERE lemma = ?", stale)
+        self.evicted = len(stale)
+        self.conn.commit()
+        self.conn.close()
+
+    def report(self):
+        if self.enabled:
+            print(f"Render cache ({self.path}): {self.hits} hits, {self.misses} misses, {self.evicted} evicted")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.conn is not None:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or clear the term bank render cache.")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cache):
+        print(f"No render cache at {args.cache}")
+    elif args.clear:
+        os.remove(args.cache)
+        print(f"Removed {args.cache}")
+    else:
+        with sqlite3.connect(args.cache) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM renders").fetchone()[0]
+        print(f"{args.cache}: {count} lemmas, {os.path.getsize(args.cache) / 1e6:.1f} MB")
@@ -2,12 +2,11 @@
 
 set -euo pipefail
 
-DIST_DIR="dict/opr"
-INDEX_FILE="$DIST_DIR/index.json"
-ZIP_NAME="opr-ru-en.zip"
+# Target languages, e.g. LANGS=en,de ./run.sh; the russian3 data is loaded once for all of them
+LANGS="${LANGS:-en}"
 TODAY=$(date +"%Y.%m.%d")
 
-for cmd in python3 jq zip; do
+for cmd in python3; do
     if ! command -v "$cmd" &> /dev/null; then
         echo "Error: $cmd is not installed." >&2
         exit 1
@@ -15,27 +14,24 @@ for cmd in python3 jq zip; do
 done
 
 echo "Generating dictionary files..."
-python3 generate_dict.py
-
-echo "Processing term bank..."
-python3 term_bank.py
-
-mkdir -p "$DIST_DIR"
-python3 utils/split_json.py term_bank_0.json "$DIST_DIR" 25000
-
-echo "Copying assets..."
-cp dict/*.json "$DIST_DIR/"
-cp dict/styles.css "$DIST_DIR/"
-
-rm -f "$DIST_DIR/zaliznyak-index.json"
-mv "$DIST_DIR/opr-ru-en-index.json" "$INDEX_FILE"
+python3 generate_dict.py --langs "$LANGS"
+
+for LANG_CODE in ${LANGS//,/ }; do
+    if [ "$LANG_CODE" = "en" ]; then
+        DICT_FILE="output/dict.bin"
+        DIST_DIR="dict/opr"
+    else
+        DICT_FILE="output/dict.$LANG_CODE.bin"
+        DIST_DIR="dict/opr-$LANG_CODE"
+    fi
+    ZIP_NAME="opr-ru-$LANG_CODE.zip"
 
-echo "Updating revision date..."
-jq --arg date "$TODAY" '.revision = $date' "$INDEX_FILE" > "${INDEX_FILE}.tmp" && mv "${INDEX_FILE}.tmp" "$INDEX_FILE"
+    echo "Processing term bank ($LANG_CODE)..."
+    python3 term_bank.py "$DICT_FILE" --output "$DIST_DIR" --chunk-size 25000 --jobs 0 --lang "$LANG_CODE"
 
-echo "Creating ZIP archive..."
-pushd "$DIST_DIR" > /dev/null
-zip -q -r "../../$ZIP_NAME" ./*
-popd > /dev/null
+    echo "Creating ZIP archive ($LANG_CODE)..."
+    python3 package.py "$DIST_DIR" "dict/opr-ru-$LANG_CODE-index.json" "$ZIP_NAME" \
+        --asset dict/tag_bank_1.json --asset dict/styles.css --revision "$TODAY"
 
-echo "Operation complete: $ZIP_NAME created"
\ No newline at end of file
+    echo "Operation complete: $ZIP_NAME created"
+done
\ No newline at end of file
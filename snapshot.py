@@ -0,0 +1,127 @@
+import argparse
+import hashlib
+import inspect
+import os
+import time
+
+import pandas as pd
+
+import loaders
+import normalize
+import utils
+
+try:
+    import pyarrow  # noqa: F401
+    SNAPSHOT_FORMAT = "feather"
+except ImportError:
+    SNAPSHOT_FORMAT = "pkl"
+
+
+CACHE_DIR = ".cache/russian3"
+# The modules whose code shapes the cleaned tables: read_csv, the loaders and the accent/diacritic helpers
+SNAPSHOT_MODULES = [loaders, normalize, utils]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_key(csv_path, loader):
+    """Hash of the CSV bytes, the loader's source and the source of SNAPSHOT_MODULES."""
+    digest = hashlib.sha256()
+    digest.update(file_digest(csv_path).encode())
+    digest.update(inspect.getsource(loader).encode())
+    for module in SNAPSHOT_MODULES:
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()[:16]
+
+
+def read_snapshot(path):
+    if path.endswith(".feather"):
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def write_snapshot(df, path):
+    tmp_path = path + ".tmp"
+    if path.endswith(".feather"):
+        df.to_feather(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class SnapshotCache:
+    """Content-addressed cache of cleaned russian3 tables.
+
+    Each snapshot is named <loader>-<key> after snapshot_key, so a changed
+    download or a changed loader misses, and older snapshots of the same
+    loader are evicted when the new one is written.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.stats = []
+
+    def load(self, csv_path, loader):
+        start = time.perf_counter()
+        if not self.enabled:
+            df = loader(csv_path).reset_index(drop=True)
+            self._record(loader, "bypass", start, df)
+            return df
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        name = loader.__name__
+        path = os.path.join(self.cache_dir, f"{name}-{snapshot_key(csv_path, loader)}.{SNAPSHOT_FORMAT}")
+        if os.path.exists(path):
+            df = read_snapshot(path)
+            self._record(loader, "hit", start, df, path)
+            return df
+
+        df = loader(csv_path).reset_index(drop=True)
+        write_snapshot(df, path)
+        self._evict(name, path)
+        self._record(loader, "miss", start, df, path)
+        return df
+
+    def _evict(self, name, keep):
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if entry.startswith(f"{name}-") and path != keep:
+                os.remove(path)
+
+    def _record(self, loader, status, start, df, path=None):
+        self.stats.append({
+            "table": loader.__name__,
+            "status": status,
+            "rows": len(df),
+            "seconds": round(time.perf_counter() - start, 3),
+            "bytes": os.path.getsize(path) if path else 0,
+        })
+
+    def report(self):
+        print(f"Snapshot cache ({self.cache_dir}, {SNAPSHOT_FORMAT}):")
+        for s in self.stats:
+            print(f"  {s['table']:<28}{s['status']:<8}{s['rows']:>10} rows{s['seconds']:>9.3f}s{s['bytes'] / 1e6:>9.1f} MB")
+        hits = sum(s["status"] == "hit" for s in self.stats)
+        print(f"  {hits} hits, {len(self.stats) - hits} misses/bypassed, {sum(s['seconds'] for s in self.stats):.3f}s total")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List or clear russian3 table snapshots.")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    entries = sorted(os.listdir(args.cache_dir)) if os.path.isdir(args.cache_dir) else []
+    for entry in entries:
+        path = os.path.join(args.cache_dir, entry)
+        print(f"{entry:<48}{os.path.getsize(path) / 1e6:>9.1f} MB")
+        if args.clear:
+            os.remove(path)
+    print(f"{len(entries)} snapshots" + (" removed" if args.clear else ""))
@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+import instrument
+from banks import BankWriter
+from instrument import Instrument
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(f, block_size=1 << 16):
+    """Yields the items of the JSON array in text file f without loading all of it.
+
+    The file is read in blocks and each item is decoded as soon as it is
+    complete, so memory is bounded by the largest item rather than the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        block = f.read(block_size)
+        eof = not block
+        buffer = buffer[pos:] + block
+        pos = 0
+
+    def next_char():
+        # The next non-whitespace character, or "" at the end of the file
+        nonlocal pos
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            fill()
+
+    if next_char() != "[":
+        raise ValueError("Input JSON must be an array of items.")
+    pos += 1
+    if next_char() == "]":
+        return
+
+    while True:
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # A number cut off by the end of the buffer ("1" of "12", "1." of "1.5") may continue in the next block
+        if not eof and isinstance(item, (int, float)) and (end == len(buffer) or buffer[end] not in " \t\n\r,]"):
+            fill()
+            continue
+        yield item
+        pos = end
+
+        c = next_char()
+        if c == "]":
+            return
+        if c != ",":
+            raise ValueError(f"Expected ',' or ']' after item, found {c!r}")
+        pos += 1
+        next_char()
+
+
+def split_json(input_file, output_folder, chunk_size=None, max_bytes=None, prefix="term_bank_", stats=None):
+    """Splits the JSON array in input_file into prefix1.json, prefix2.json, ... in output_folder.
+
+    Banks hold at most chunk_size items and/or max_bytes bytes, see BankWriter.
+    Returns the closed BankWriter, whose paths and total_rows describe the result.
+    """
+    if chunk_size is None and max_bytes is None:
+        raise ValueError("Give a chunk size, a byte size or both.")
+    stats = stats or Instrument("split_json")
+
+    with stats.stage("split") as stage, open(input_file, "r", encoding="utf-8") as infile, \
+            BankWriter(output_folder, prefix, chunk_size, max_bytes) as banks:
+        for item in iter_json_array(infile):
+            banks.write(item)
+        stage["items"] = banks.total_rows
+    return banks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a JSON array into numbered Yomitan bank files.")
+    parser.add_argument("input_file")
+    parser.add_argument("output_folder")
+    parser.add_argument("chunk_size", nargs="?", type=int, help="items per bank")
+    parser.add_argument("--max-bytes", type=int, help="bytes per bank (the item count still applies if given)")
+    parser.add_argument("--prefix", default="term_bank_", help="bank file prefix, e.g. term_meta_bank_")
+    parser.add_argument("-y", "--yes", action="store_true", help="do not ask before writing")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.chunk_size is None and args.max_bytes is None:
+        parser.error("give a chunk_size, --max-bytes or both")
+    for value in (args.chunk_size, args.max_bytes):
+        if value is not None and value <= 0:
+            parser.error("sizes must be positive integers")
+
+    # Only a person at a terminal is asked; pipelines never block here
+    if not args.yes and sys.stdin.isatty():
+        limits = [f"{args.chunk_size} items" if args.chunk_size else "", f"{args.max_bytes} bytes" if args.max_bytes else ""]
+        print(f"Splitting {args.input_file} ({os.path.getsize(args.input_file) / 1e6:.1f} MB) into {args.output_folder}/{args.prefix}N.json "
+              f"of at most {' / '.join(l for l in limits if l)}, replacing existing {args.prefix}N.json files.")
+        if input("Do you want to proceed? (y/n): ").strip().lower() != "y":
+            print("Operation canceled.")
+            sys.exit(1)
+
+    stats = instrument.from_args("split_json", args)
+    banks = split_json(args.input_file, args.output_folder, args.chunk_size, args.max_bytes, args.prefix, stats)
+    print(f"Saved {banks.total_rows} items to {len(banks.paths)} files in {args.output_folder}")
+    stats.report()
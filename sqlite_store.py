@@ -0,0 +1,247 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from instrument import Instrument
+from loaders import *
+from memory_store import load_sentence_tables, load_table, show_na_column, show_word_stats
+from records import WordRecord
+
+
+DB_PATH = "output/russian3.sqlite"
+# Keeps every IN (...) list below SQLite's bound parameter limit
+QUERY_CHUNK = 400
+
+INDEXES = [
+    ("words", "id"),
+    ("words_forms", "word_id"),
+    ("words_rels", "word_id"),
+    ("words_rels", "rel_word_id"),
+    ("nouns", "word_id"),
+    ("verbs", "word_id"),
+    ("expressions_words", "expression_id"),
+    ("expressions_words", "referenced_word_id"),
+    ("translations", "word_id"),
+    ("sentences", "sentence_id"),
+    ("word_sentences", "word_id"),
+]
+
+
+def write_table(conn, stats, name, df):
+    """Bulk-loads df, adding a pos column that keeps the CSV row order."""
+    df = df.reset_index(drop=True)
+    df.insert(len(df.columns), "pos", range(len(df)))
+    with stats.stage(f"sqlite:{name}", items=len(df)):
+        df.to_sql(name, conn, index=False, chunksize=50000)
+    df.info()
+    show_na_column(df)
+
+
+def chunked(ids, size=QUERY_CHUNK):
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+class SQLiteStore:
+    """The russian3 dataset in an indexed SQLite file, see load_sqlite_store.
+
+    Offers the same accessors as MemoryStore, for the target language lang.
+    prefetch() answers a whole batch of selected words with one query per
+    table, and only that batch (plus the words it links to) is kept in memory.
+    """
+
+    def __init__(self, conn, bool_columns, lang="en"):
+        if lang not in LANGS:
+            raise ValueError(f"Unknown language: {lang}")
+        self.conn = conn
+        self.bool_columns = bool_columns
+        self.lang = lang
+        self.prefetch([])
+
+    def query(self, sql, ids, repeat=1):
+        """Runs sql, whose {ids} placeholders become IN lists, over ids in chunks."""
+        rows = []
+        for chunk in chunked(ids):
+            marks = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(sql.format(ids=marks), chunk * repeat).fetchall())
+        return rows
+
+    def query_ordered(self, sql, ids, repeat=1):
+        """Like query, for sql selecting pos first: rows come back once each, in CSV order."""
+        rows = {row[0]: row[1:] for row in self.query(sql, ids, repeat)}
+        return [rows[pos] for pos in sorted(rows)]
+
+    def selected(self):
+        cursor = self.conn.execute(
+            "SELECT id, bare, accented, derived_from_word_id, rank, type FROM words WHERE selected = 1 ORDER BY pos"
+        )
+        return [(row[0], WordRecord(*row[1:])) for row in cursor]
+
+    def prefetch(self, batch):
+        ids = [word_id for word_id, _ in batch]
+        self.ids = set(ids)
+
+        # lang is one of LANGS, so it can be spelled into the SQL
+        self.usage = dict(self.query(f"SELECT id, usage_{self.lang} FROM words WHERE id IN ({{ids}})", ids))
+
+        self.translations = {}
+        for word_id, *translation in self.query_ordered(
+            f"SELECT pos, word_id, tl, example_ru, example_tl, info FROM translations WHERE lang = '{self.lang}' AND word_id IN ({{ids}})", ids
+        ):
+            self.translations.setdefault(word_id, []).append(translation)
+
+        self.forms = {}
+        for word_id, form_type, form in self.query_ordered(
+            "SELECT pos, word_id, form_type, form FROM words_forms WHERE word_id IN ({ids})", ids
+        ):
+            forms = self.forms.setdefault(word_id, {})
+            forms[form_type] = form if form_type not in forms else forms[form_type] + ", " + form
+
+        self.extra = {"noun": self.fetch_extra("nouns", ids), "verb": self.fetch_extra("verbs", ids)}
+
+        self.sentences = {}
+        for word_id, ru, tl_en in self.query_ordered(
+            f"SELECT w.pos, w.word_id, s.ru, s.tl_{self.lang} FROM word_sentences w JOIN sentences s ON s.sentence_id = w.sentence_id "
+            f"WHERE w.lang = '{self.lang}' AND w.word_id IN ({{ids}})", ids
+        ):
+            self.sentences.setdefault(word_id, []).append([ru, tl_en])
+
+        # Both directions of a relation, in the order the CSV rows list them
+        self.relateds = {}
+        for word_id, rel_word_id, relation in self.query_ordered(
+            "SELECT pos, word_id, rel_word_id, relation FROM words_rels "
+            "WHERE word_id IN ({ids}) OR rel_word_id IN ({ids})", ids, repeat=2
+        ):
+            for a, b in ((word_id, rel_word_id), (rel_word_id, word_id)):
+                if a in self.ids:
+                    rels = self.relateds.setdefault(a, {k: [] for k in RELATIONS})[relation]
+                    if b not in rels:
+                        rels.append(b)
+
+        self.expressions_by_word = {}
+        self.words_by_expression = {}
+        for expression_id, referenced_word_id in self.query_ordered(
+            "SELECT pos, expression_id, referenced_word_id FROM expressions_words "
+            "WHERE expression_id IN ({ids}) OR referenced_word_id IN ({ids})", ids, repeat=2
+        ):
+            if referenced_word_id in self.ids:
+                self.expressions_by_word.setdefault(referenced_word_id, []).append(expression_id)
+            if expression_id in self.ids:
+                self.words_by_expression.setdefault(expression_id, []).append(referenced_word_id)
+
+        linked = [value.derived_from_word_id for _, value in batch]
+        for rels in self.relateds.values():
+            for rel_ids in rels.values():
+                linked.extend(rel_ids)
+        for index in (self.expressions_by_word, self.words_by_expression):
+            for linked_ids in index.values():
+                linked.extend(linked_ids)
+
+        accented = dict(self.query("SELECT id, accented FROM words WHERE id IN ({ids})", linked))
+        translation_lists = {}
+        for word_id, tl in self.query_ordered(
+            f"SELECT pos, word_id, tl FROM translations WHERE lang = '{self.lang}' AND word_id IN ({{ids}})", linked
+        ):
+            translation_lists.setdefault(word_id, []).append(tl)
+        self.descriptions = build_descriptions(accented, {k: "; ".join(v) for k, v in translation_lists.items()})
+
+    def fetch_extra(self, table, ids):
+        cursor = self.conn.execute(f"SELECT * FROM {table} LIMIT 0")
+        columns = [c[0] for c in cursor.description if c[0] not in ("word_id", "pos")]
+        bools = self.bool_columns.get(table, ())
+        extra = {}
+        for row in self.query(f"SELECT word_id, {', '.join(columns)} FROM {table} WHERE word_id IN ({{ids}})", ids):
+            extra[row[0]] = {c: bool(v) if c in bools else v for c, v in zip(columns, row[1:])}
+        return extra
+
+    def get_accented(self, word_id: int):
+        return self.describe(word_id)[0]
+
+    def get_usage(self, word_id: int):
+        return self.usage.get(word_id, "")
+
+    def get_extra_info(self, word_id: int, Type: str):
+        return self.extra.get(Type, {}).get(word_id, {})
+
+    def get_translations(self, word_id: int):
+        return self.translations.get(word_id, [])
+
+    def get_translation_str(self, word_id: int):
+        return self.describe(word_id)[1]
+
+    def describe(self, word_id: int):
+        return self.descriptions.get(word_id, NO_DESCRIPTION)
+
+    def get_expressions(self, word_id: int, Type: str):
+        # 若查的是单词，则返回expression列表
+        if Type != "expression":
+            return [self.describe(i) for i in self.expressions_by_word.get(word_id, [])]
+        # 若查的是expression，返回单词的列表
+        else:
+            return [self.describe(i) for i in self.words_by_expression.get(word_id, [])]
+
+    def get_sentences(self, word_id: int):
+        return self.sentences.get(word_id, [])
+
+    def get_forms(self, word_id: int):
+        return self.forms.get(word_id, {})
+
+    def get_relateds(self, word_id: int):
+        relateds_word = self.relateds.get(word_id, {k: [] for k in RELATIONS})
+        return {k: [self.describe(v) for v in relateds_word[k]] for k in relateds_word}
+
+
+def load_sqlite_store(snapshots, db_path=DB_PATH, stats=None, sentence_limit=SENTENCES_PER_WORD, seed=0, langs=("en",)):
+    """Bulk-loads the cleaned russian3 tables into a fresh SQLite file.
+
+    Returns {lang: SQLiteStore} for each of langs, all on the same file.
+    """
+    stats = stats or Instrument("sqlite_store")
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    words = load_table(snapshots, stats, "words", load_words)
+    show_word_stats(words)
+    # Disabled的词、type为NaN的词，将没有主页面，但是可以被relate到
+    words["selected"] = (~pd.isna(words["type"]) & (words["disabled"] == 0)).astype(int)
+    write_table(conn, stats, "words", words.drop(columns=["disabled"]))
+    del words
+
+    bool_columns = {}
+    for name, loader in [
+        ("words_forms", load_words_forms),
+        ("words_rels", load_words_rels),
+        ("nouns", load_nouns),
+        ("verbs", load_verbs),
+        ("expressions_words", load_expressions_words),
+        ("translations", load_translations),
+    ]:
+        df = load_table(snapshots, stats, name, loader)
+        bool_columns[name] = [c for c in df.columns if df[c].dtype == bool]
+        write_table(conn, stats, name, df)
+        del df
+
+    sentences_csv, sentences_translations_csv, sentences_words_csv = load_sentence_tables(snapshots, stats)
+    sentences = sentences_csv.rename(columns={"id": "sentence_id"}).merge(sentences_translations_csv, on="sentence_id")
+    write_table(conn, stats, "sentences", sentences)
+    print("Builing Sentence Dict...")
+    sampled = []
+    for lang in langs:
+        translated = sentences_translations_csv.loc[sentences_translations_csv[f"tl_{lang}"].notna(), "sentence_id"]
+        lang_sampled = sample_sentences(sentences_words_csv[sentences_words_csv["sentence_id"].isin(translated)], sentence_limit, seed)
+        lang_sampled.insert(0, "lang", lang)
+        sampled.append(lang_sampled)
+    write_table(conn, stats, "word_sentences", pd.concat(sampled, ignore_index=True))
+    del sentences_csv, sentences_translations_csv, sentences_words_csv, sentences, sampled
+
+    with stats.stage("sqlite:indexes", items=len(INDEXES)):
+        for table, column in INDEXES:
+            conn.execute(f"CREATE INDEX {table}_{column} ON {table} ({column})")
+        conn.commit()
+    return {lang: SQLiteStore(conn, bool_columns, lang) for lang in langs}
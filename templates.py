@@ -0,0 +1,33 @@
+import json
+
+from banks import encode_row
+
+
+# Stands for a variable value in a template skeleton
+SLOT = "\x00slot\x00"
+
+_encode_string = json.encoder.encode_basestring
+
+
+def encode(value):
+    """The JSON of one value, exactly as encode_row writes it inside a row."""
+    return _encode_string(value) if type(value) is str else encode_row(value)
+
+
+def encode_list(encoded):
+    return "[" + ",".join(encoded) + "]"
+
+
+class Template:
+    """A JSON structure encoded once, with SLOT values filled in per use.
+
+    fill() takes already encoded JSON for each SLOT, in the order they appear,
+    and returns the same string encode_row would for the whole structure.
+    """
+
+    def __init__(self, skeleton):
+        parts = encode_row(skeleton).split(encode(SLOT))
+        self.format = "%s".join(part.replace("%", "%%") for part in parts)
+
+    def fill(self, *values):
+        return self.format % values
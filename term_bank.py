@@ -1,56 +1,135 @@
 import json
-import unicodedata
 import re
 import os
+import sys
 import urllib.parse
+import argparse
+import multiprocessing
+from collections import deque
+
+import msgpack
+
+import banks
+import highlight
+import normalize
+import templates
+from banks import BankWriter
+from dictstore import DictReader, encode_default, open_dict
+from highlight import get_highlighter
+import instrument
+from instrument import Instrument
+from normalize import variant_table
+from render_cache import CACHE_PATH, RenderCache, lang_cache_path, render_salt
+from templates import SLOT, Template, encode, encode_list
+
+
+# The structured content below is encoded once into these templates, and
+# rendering only encodes the variable strings spliced into them
+HIGHLIGHT = Template({"tag": "span", "data": {"content": "example-highlight"}, "content": SLOT})
+
+GLOSS = Template({"tag": "li", "content": [{"tag": "div", "content": [SLOT]}]})
+
+GLOSS_WITH_EXAMPLE = Template(
+    {
+        "tag": "li",
+        "content": [
+            {
+                "tag": "div",
+                "content": [
+                    SLOT,
+                    {
+                        "tag": "details",
+                        "data": {"content": "details-entry-examples"},
+                        "content": [
+                            {
+                                "tag": "summary",
+                                "data": {"content": "summary-entry"},
+                                "content": "1 example",
+                            },
+                            {
+                                "tag": "div",
+                                "data": {"content": "extra-info"},
+                                "content": {
+                                    "tag": "div",
+                                    "data": {"content": "example-sentence"},
+                                    "content": [
+                                        {
+                                            "tag": "div",
+                                            "data": {"content": "example-sentence-a"},
+                                            "content": SLOT,
+                                        },
+                                        {
+                                            "tag": "div",
+                                            "data": {"content": "example-sentence-b"},
+                                            "content": SLOT,
+                                        },
+                                    ],
+                                },
+                            },
+                        ],
+                    },
+                ],
+            }
+        ],
+    }
+)
 
+USAGE = Template(
+    {
+        "tag": "div",
+        "content": [
+            {
+                "tag": "details",
+                "data": {"content": "details-entry-Usage"},
+                "content": [
+                    {
+                        "tag": "summary",
+                        "data": {"content": "summary-entry"},
+                        "content": "Usage",
+                    },
+                    {
+                        "tag": "div",
+                        "data": {"content": "Usage-content"},
+                        "content": SLOT,
+                    },
+                ],
+            }
+        ],
+    }
+)
 
-def remove_diacritics(text):
-    if not text:
-        return ""
-    nfd_text = unicodedata.normalize("NFD", text)
-    return "".join(c for c in nfd_text if not unicodedata.combining(c))
-
-
-def highlight_terms(text, terms):
-    if not text or not terms:
-        return [text]
+GLOSSES = Template({"tag": "ol", "data": {"content": "glosses"}, "content": SLOT})
 
-    search_terms = set()
-    for t in terms:
-        if t:
-            search_terms.add(re.escape(t))
-            search_terms.add(re.escape(remove_diacritics(t)))
+BACKLINK = Template(
+    {
+        "tag": "div",
+        "data": {"content": "backlink"},
+        "content": [{"tag": "a", "href": SLOT, "content": "OpenRussian"}],
+    }
+)
 
-    sorted_terms = sorted(list(search_terms), key=len, reverse=True)
+LEMMA_ROW = Template([SLOT, SLOT, SLOT, "", 0, [{"type": "structured-content", "content": SLOT}], 0, ""])
 
-    pattern = re.compile(rf"\b({'|'.join(sorted_terms)})\b", re.IGNORECASE)
+# Yomitan reads the rules of one deinflection as a chain applied in sequence,
+# so each description of a form gets a deinflection of its own
+FORM_ROW = Template([SLOT, SLOT, "non-lemma", "", 0, SLOT, 0, ""])
 
-    parts = pattern.split(text)
+LEMMA_RULE = Template([SLOT, SLOT])
 
-    content_list = []
-    lookup_set = {remove_diacritics(t).lower() for t in terms}
 
-    for part in parts:
-        if not part:
-            continue
+def split_forms(value):
+    """The individual forms of a forms value, which joins the forms of one form_type with ", "."""
+    return [form for form in (part.strip() for part in value.split(",")) if form]
 
-        clean_part = remove_diacritics(part).lower()
-        if clean_part in lookup_set:
-            content_list.append(
-                {
-                    "tag": "span",
-                    "data": {"content": "example-highlight"},
-                    "content": part,
-                }
-            )
-        else:
-            content_list.append(part)
 
-    return content_list
+def encode_highlighted(highlighter, text):
+    """text as encoded example content: plain parts as strings, forms of the word as highlight spans."""
+    return encode_list(HIGHLIGHT.fill(encode(part)) if highlighted else encode(part) for part, highlighted in highlighter.split(text))
 
 
 def build_glosses(translations, all_forms):
+    """The encoded gloss list items of translations."""
+    highlighter = get_highlighter(frozenset(all_forms))
     glosses = []
     for trans in translations:
         main_text = trans[0]
@@ -60,56 +139,101 @@ def build_glosses(translations, all_forms):
             extra_info = re.sub(r"[.\!?,\s]+$", "", extra_info)
             main_text += f" ({extra_info})"
 
-        trans_div = {"tag": "div", "content": [main_text]}
-
         if trans[1] and trans[2]:
-            ex_count = 1
-            summary_text = f"{ex_count} example" + ("s" if ex_count > 1 else "")
+            glosses.append(GLOSS_WITH_EXAMPLE.fill(encode(main_text), encode_highlighted(highlighter, trans[1]), encode(trans[2])))
+        else:
+            glosses.append(GLOSS.fill(encode(main_text)))
 
-            example_a = highlight_terms(trans[1], all_forms)
+    return glosses
 
-            example_content = {
-                "tag": "div",
-                "data": {"content": "extra-info"},
-                "content": {
-                    "tag": "div",
-                    "data": {"content": "example-sentence"},
-                    "content": [
-                        {
-                            "tag": "div",
-                            "data": {"content": "example-sentence-a"},
-                            "content": example_a,
-                        },
-                        {
-                            "tag": "div",
-                            "data": {"content": "example-sentence-b"},
-                            "content": trans[2],
-                        },
-                    ],
-                },
-            }
 
-            details = {
-                "tag": "details",
-                "data": {"content": "details-entry-examples"},
-                "content": [
-                    {
-                        "tag": "summary",
-                        "data": {"content": "summary-entry"},
-                        "content": summary_text,
-                    },
-                    example_content,
-                ],
-            }
+def render_lemma(lemma, entries, props, variants, lang="en"):
+    """Yields the encoded term bank rows of one lemma: its entries, then their non-lemma forms.
 
-            trans_div["content"].append(details)
+    Each form gets one row, with a deinflection to the lemma for every form
+    type of the lemma's entries it appears under. variants maps each form to its
+    stripped variant, see shard_variants; lang picks the
+    OpenRussian site the entries link back to.
+    """
+    encoded_lemma = encode(lemma)
+    # form -> [rule description, ...], in first-seen order
+    form_rules = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
 
-        glosses.append({"tag": "li", "content": [trans_div]})
+        translations = entry.get("translations", [])
+        if not translations:
+            continue
 
-    return glosses
+        forms_dict = entry.get("forms", {})
+        all_word_variants = [lemma] + [
+            v for v in forms_dict.values() if isinstance(v, str) and v
+        ]
+
+        tags = []
+        overview = entry.get("overview", {})
+        extra = entry.get("extra", {})
+
+        if "type" in overview:
+            tag = props["types"].get(overview["type"], {}).get("meaning", "")
+            if tag:
+                tags.append(tag)
+        if "aspect" in extra:
+            tag = props["aspects"].get(extra["aspect"], {}).get("meaning", "")
+            if tag:
+                tags.append(tag)
+        if "gender" in extra:
+            tag = props["genders"].get(extra["gender"], {}).get("meaning", "")
+            if tag:
+                tags.append(tag)
+        if overview.get("type") == "noun":
+            for p in ["animate", "indeclinable", "sg_only", "pl_only"]:
+                if extra.get(p) is True:
+                    tag = props["noun_props"].get(p, {}).get("meaning", "")
+                    if tag:
+                        tags.append(tag)
+
+        lemma_accented = overview.get("accented", lemma)
+        content = []
+
+        if entry.get("usage"):
+            content.append(USAGE.fill(encode(entry["usage"])))
+
+        content.append(GLOSSES.fill(encode_list(build_glosses(translations, all_word_variants))))
+        content.append(BACKLINK.fill(encode(f"https://{lang}.openrussian.org/ru/{urllib.parse.quote(lemma)}")))
+
+        yield LEMMA_ROW.fill(encoded_lemma, encode(lemma_accented), encode(" ".join(tags)), encode_list(content))
+
+        for form_key, form_value in forms_dict.items():
+            if not form_value or not isinstance(form_value, str):
+                continue
+            rule_desc = props["forms"].get(form_key, {}).get("meaning", form_key)
+            for form in split_forms(form_value):
+                rules = form_rules.setdefault(form, [])
+                if rule_desc not in rules:
+                    rules.append(rule_desc)
 
+    for form, rules in form_rules.items():
+        yield FORM_ROW.fill(encode(variants[form]), encode(form), encode_list(
+            LEMMA_RULE.fill(encoded_lemma, encode_list([encode(rule)])) for rule in rules
+        ))
 
-def generate_term_bank(input_file):
+
+
+def shard_variants(shard):
+    """Strips every non-lemma form of a shard in one column pass."""
+    strings = []
+    for _, entries in shard:
+        for entry in entries:
+            if isinstance(entry, dict):
+                for value in entry.get("forms", {}).values():
+                    if isinstance(value, str) and value:
+                        strings.extend(split_forms(value))
+    return variant_table(strings)
+
+
+def load_props():
     prop_files = {
         "types": "props/types.json",
         "aspects": "props/aspects.json",
@@ -125,129 +249,144 @@ def generate_term_bank(input_file):
                 props[key] = json.load(f)
         else:
             props[key] = {}
-
-    with open(input_file, "r", encoding="utf-8") as f:
-        dictionary = json.load(f)
-
-    term_bank = []
-
+    return props
+
+
+_worker_props = None
+_worker_dict = None
+_worker_lang = "en"
+
+
+def _init_worker(input_file, dictionary=None, lang="en"):
+    global _worker_props, _worker_dict, _worker_lang
+    _worker_props = load_props()
+    _worker_lang = lang
+    if input_file.endswith(".json"):
+        # Shards carry their records; drop a reader left by an earlier dict.bin run in this process
+        _worker_dict = None
+    else:
+        _worker_dict = dictionary if dictionary is not None else DictReader(input_file)
+
+
+def _render_shard(shard):
+    """The encoded rows of every lemma in shard, one list per lemma."""
+    # With dict.bin the shard is a list of record offsets read from the worker's own map
+    if _worker_dict is not None:
+        shard = [_worker_dict.read_at(offset) for offset in shard]
+    variants = shard_variants(shard)
+    return [list(render_lemma(lemma, entries, _worker_props, variants, _worker_lang)) for lemma, entries in shard]
+
+
+def iter_shards(items, shard_size):
+    shard = []
+    for item in items:
+        shard.append(item)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def iter_records(dictionary):
+    """(lemma, record bytes, payload) in dictionary order; payload is what _render_shard takes."""
+    if isinstance(dictionary, DictReader):
+        for lemma, offset in dictionary.index.items():
+            yield lemma, dictionary.raw_at(offset), offset
+        return
+    packer = msgpack.Packer(default=encode_default)
     for lemma, entries in dictionary.items():
-        for entry in entries:
-            if not isinstance(entry, dict):
-                continue
-
-            translations = entry.get("translations", [])
-            if not translations:
-                continue
-
-            forms_dict = entry.get("forms", {})
-            all_word_variants = [lemma] + [
-                v for v in forms_dict.values() if isinstance(v, str) and v
-            ]
-
-            tags = []
-            overview = entry.get("overview", {})
-            extra = entry.get("extra", {})
-
-            if "type" in overview:
-                tag = props["types"].get(overview["type"], {}).get("meaning", "")
-                if tag:
-                    tags.append(tag)
-            if "aspect" in extra:
-                tag = props["aspects"].get(extra["aspect"], {}).get("meaning", "")
-                if tag:
-                    tags.append(tag)
-            if "gender" in extra:
-                tag = props["genders"].get(extra["gender"], {}).get("meaning", "")
-                if tag:
-                    tags.append(tag)
-            if overview.get("type") == "noun":
-                for p in ["animate", "indeclinable", "sg_only", "pl_only"]:
-                    if extra.get(p) is True:
-                        tag = props["noun_props"].get(p, {}).get("meaning", "")
-                        if tag:
-                            tags.append(tag)
-
-            lemma_accented = overview.get("accented", lemma)
-            content = []
-
-            if entry.get("usage"):
-                usage_details = {
-                    "tag": "details",
-                    "data": {"content": "details-entry-Usage"},
-                    "content": [
-                        {
-                            "tag": "summary",
-                            "data": {"content": "summary-entry"},
-                            "content": "Usage",
-                        },
-                        {
-                            "tag": "div",
-                            "data": {"content": "Usage-content"},
-                            "content": entry["usage"],
-                        },
-                    ],
-                }
-                content.append({"tag": "div", "content": [usage_details]})
-
-            content.append(
-                {
-                    "tag": "ol",
-                    "data": {"content": "glosses"},
-                    "content": build_glosses(translations, all_word_variants),
-                }
-            )
-
-            encoded_lemma = urllib.parse.quote(lemma)
-            content.append(
-                {
-                    "tag": "div",
-                    "data": {"content": "backlink"},
-                    "content": [
-                        {
-                            "tag": "a",
-                            "href": f"https://en.openrussian.org/ru/{encoded_lemma}",
-                            "content": "OpenRussian",
-                        }
-                    ],
-                }
-            )
-
-            term_bank.append(
-                [
-                    lemma,
-                    lemma_accented,
-                    " ".join(tags),
-                    "",
-                    0,
-                    [{"type": "structured-content", "content": content}],
-                    0,
-                    "",
-                ]
-            )
-
-            for form_key, form_value in forms_dict.items():
-                if not form_value or not isinstance(form_value, str):
-                    continue
-                rule_desc = props["forms"].get(form_key, {}).get("meaning", form_key)
-                term_bank.append(
-                    [
-                        remove_diacritics(form_value),
-                        form_value,
-                        "non-lemma",
-                        "",
-                        0,
-                        [[lemma, [rule_desc]]],
-                        0,
-                        "",
-                    ]
-                )
-
-    with open("term_bank_0.json", "w", encoding="utf-8") as f:
-        json.dump(term_bank, f, ensure_ascii=False, indent=2)
+        # The same bytes DictWriter stores, so both inputs share cache entries
+        yield lemma, packer.pack([lemma, entries]), (lemma, entries)
+
+
+def plan_shards(records, shard_size, cache, plans):
+    """Yields the payloads of each shard's lemmas that must be rendered.
+
+    The shard's (lemma, digest, fresh) list is appended to plans first, so the
+    consumer can interleave cached and rendered rows in dictionary order.
+    """
+    for shard in iter_shards(records, shard_size):
+        plan = []
+        payloads = []
+        for lemma, record, payload in shard:
+            digest = cache.digest(record)
+            fresh = cache.check(lemma, digest)
+            plan.append((lemma, digest, fresh))
+            if not fresh:
+                payloads.append(payload)
+        plans.append(plan)
+        yield payloads
+
+
+def generate_term_bank(input_file, output_folder="dict/opr", chunk_size=25000, jobs=1, shard_size=500, stats=None,
+                       cache_path=CACHE_PATH, lang="en"):
+    """Renders dict.bin (or dict.json) into term banks.
+
+    Lemmas whose record, props and rendering code are unchanged since the last
+    run are copied from the render cache at cache_path (None disables it).
+    """
+    stats = stats or Instrument("term_bank")
+    dictionary = open_dict(input_file)
+    salt = render_salt({**load_props(), "lang": lang}, [sys.modules[__name__], banks, highlight, normalize, templates])
+
+    try:
+        with stats.stage("render") as stage, BankWriter(output_folder, "term_bank_", chunk_size) as term_bank, \
+                RenderCache(cache_path, salt, enabled=cache_path is not None) as cache:
+            plans = deque()
+            shards = plan_shards(iter_records(dictionary), shard_size, cache, plans)
+            pool = None
+            if jobs == 1:
+                # In this process the shards are read from the same map as the records
+                _init_worker(input_file, dictionary, lang)
+                rendered = map(_render_shard, shards)
+            else:
+                # Shards come back in submission order, so the banks match a serial run
+                pool = multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(input_file, None, lang))
+                rendered = pool.imap(_render_shard, shards)
+            try:
+                for rendered_rows in rendered:
+                    plan = plans.popleft()
+                    cached = cache.fetch([lemma for lemma, _, fresh in plan if fresh])
+                    rendered_rows = iter(rendered_rows)
+                    new = []
+                    for lemma, digest, fresh in plan:
+                        if fresh:
+                            rows = cached[lemma]
+                        else:
+                            rows = next(rendered_rows)
+                            new.append((lemma, digest, rows))
+                        for encoded in rows:
+                            term_bank.write_encoded(encoded)
+                    cache.store(new)
+            finally:
+                if pool is not None:
+                    pool.terminate()
+            stage["items"] = term_bank.total_rows
+            stage["cache_hits"] = cache.hits
+            stage["cache_misses"] = cache.misses
+    finally:
+        if isinstance(dictionary, DictReader):
+            dictionary.close()
+    stage["cache_evicted"] = cache.evicted
+    cache.report()
+    print(f"Wrote {term_bank.total_rows} rows to {len(term_bank.paths)} term banks in {output_folder}")
 
 
 if __name__ == "__main__":
-    input_file = "output/dict.json"
-    if os.path.exists(input_file):
-        generate_term_bank(input_file)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_file", nargs="?", default="output/dict.bin", help="dict.bin (or a legacy dict.json)")
+    parser.add_argument("--output", default="dict/opr", help="folder for the term_bank_N.json files")
+    parser.add_argument("--chunk-size", type=int, default=25000, help="rows per term bank")
+    parser.add_argument("--jobs", type=int, default=1, help="render with this many processes (0: one per CPU)")
+    parser.add_argument("--lang", default="en", help="target language of the input, used for the OpenRussian backlinks")
+    parser.add_argument("--cache", help=f"render cache file, reused across builds (default: {CACHE_PATH}, per language)")
+    parser.add_argument("--no-cache", action="store_true", help="render every lemma and leave the cache alone")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    if os.path.exists(args.input_file):
+        stats = instrument.from_args("term_bank", args)
+        generate_term_bank(args.input_file, args.output, args.chunk_size, args.jobs or os.cpu_count(), stats=stats,
+                           cache_path=None if args.no_cache else args.cache or lang_cache_path(args.lang), lang=args.lang)
+        stats.report()
@@ -1,5 +1,14 @@
+import unicodedata
+
+
 def addStress(c):
     return c+chr(769)
 
 def convertStress(word: str):
     return word.replace("'", chr(769))
+
+def remove_diacritics(text):
+    if not text:
+        return ""
+    nfd_text = unicodedata.normalize("NFD", text)
+    return "".join(c for c in nfd_text if not unicodedata.combining(c))
@@ -1,7 +1,11 @@
 import json
+import os
 import sys
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dictstore import open_dict
+
 def extract_unique_properties(data):
     unique_types = defaultdict(dict)
     unique_aspects = defaultdict(dict)
@@ -41,13 +45,12 @@ def extract_unique_properties(data):
 
 def main():
     if len(sys.argv) != 2:
-        print("Usage: python extract_unique.py input.json")
+        print("Usage: python extract_unique.py output/dict.bin")
         sys.exit(1)
     
     input_file = sys.argv[1]
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = open_dict(input_file)
     
     types, aspects, genders, forms, noun_props = extract_unique_properties(data)
     
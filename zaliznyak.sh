@@ -7,7 +7,7 @@ SRC_DIR="zaliznyak"
 DIST_DIR="$ROOT_DIR/dict/zaliz"
 TODAY=$(date +"%Y.%m.%d")
 
-for cmd in python3 jq zip; do
+for cmd in python3; do
     if ! command -v "$cmd" &> /dev/null; then
         echo "Error: $cmd is not installed." >&2
         exit 1
@@ -26,15 +26,8 @@ if [[ ! -d "dictionary" ]]; then
     sh download.sh
 fi
 
-echo "Converting JSON..."
-if [[ ! -f "zaliznyak_index_only.json" ]]; then
-    python3 convert.py
-fi
-
-echo "Splitting JSON files..."
-mkdir -p "$DIST_DIR/index" "$DIST_DIR/prefix"
-python3 split_json.py zaliznyak_index_only.json "$DIST_DIR/index" 1000
-python3 split_json.py zaliznyak_prefix_and_index.json "$DIST_DIR/prefix" 1000
+echo "Converting to term meta banks..."
+python3 convert.py --jobs 0 --output "$DIST_DIR" --bank-size 1000
 
 popd > /dev/null
 
@@ -56,12 +49,8 @@ for type in "index" "prefix"; do
         continue
     fi
 
-    jq --arg date "$TODAY" '.revision = $date' "$SRC_INDEX_FILE" > "$TARGET_DIR/index.json"
-
     echo "Creating $ZIP_NAME..."
-    pushd "$TARGET_DIR" > /dev/null
-    zip -q -r "$ROOT_DIR/$ZIP_NAME" ./*
-    popd > /dev/null
+    python3 package.py "$TARGET_DIR" "$SRC_INDEX_FILE" "$ROOT_DIR/$ZIP_NAME" --revision "$TODAY"
 done
 
 echo "Operation complete: zaliznyak.zip and zaliznyak-prefix.zip are in $ROOT_DIR"
\ No newline at end of file
@@ -1,11 +1,25 @@
 import os
 import re
-import json
+import sys
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrument
+from banks import BankWriter
+from instrument import Instrument
 
 INPUT_DIR = 'dictionary'
-OUTPUT_FILE_1 = 'zaliznyak_index_only.json'
-OUTPUT_FILE_2 = 'zaliznyak_prefix_and_index.json'
+# index/ gets the bare index, prefix/ the prefix and index, as term_meta_bank_N.json
+OUTPUT_DIR = os.path.join('..', 'dict', 'zaliz')
+BANK_SIZE = 1000
 ZERO_WIDTH_SPACE = '\u200B'
+# Files larger than this are parsed in several byte ranges
+CHUNK_BYTES = 1 << 20
+
+GRAM_END = re.compile(r'\(|_')
+INDEX_START = re.compile(r'(\d|<|⌧|◑|△|мс-п)')
 
 def clean_word(text):
     """Removes stress marks but keeps ё."""
@@ -29,9 +43,9 @@ def parse_line(line):
     reading = raw_lemma
     word = clean_word(reading)
 
-    gram_part = re.split(r'\(|_', rest)[0].strip()
+    gram_part = GRAM_END.split(rest, maxsplit=1)[0].strip()
 
-    match = re.search(r'(\d|<|⌧|◑|△|мс-п)', gram_part)
+    match = INDEX_START.search(gram_part)
     
     if match:
         split_idx = match.start()
@@ -49,54 +63,104 @@ def parse_line(line):
         "index": index
     }
 
-def process_dictionary():
-    output1_data = []
-    output2_data = []
+def list_chunks(chunk_bytes=CHUNK_BYTES):
+    """(path, start, end) byte ranges of every .txt file, in sorted path order.
 
+    Ranges end on a line boundary, so each one can be parsed on its own.
+    """
+    chunks = []
     for root, dirs, files in os.walk(INPUT_DIR):
-        for file in files:
+        dirs.sort()
+        for file in sorted(files):
             if file.endswith('.txt'):
                 file_path = os.path.join(root, file)
                 print(f"Processing: {file_path}")
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        parsed = parse_line(line)
-                        if not parsed:
-                            continue
-
-                        output1_data.append([
-                            parsed["word"],
-                            "freq",
-                            {
-                                "reading": parsed["reading"],
-                                "frequency": {
-                                    "value": 0,
-                                    "displayValue": f"{ZERO_WIDTH_SPACE}{parsed['index']}"
-                                }
-                            }
-                        ])
-
-                        combined_val = f"{parsed['prefix']} {parsed['index']}".strip()
-                        output2_data.append([
-                            parsed["word"],
-                            "freq",
-                            {
-                                "reading": parsed["reading"],
-                                "frequency": {
-                                    "value": 0,
-                                    "displayValue": f"{ZERO_WIDTH_SPACE}{combined_val}"
-                                }
-                            }
-                        ])
-
-    with open(OUTPUT_FILE_1, 'w', encoding='utf-8') as f:
-        json.dump(output1_data, f, ensure_ascii=False, indent=2)
-
-    with open(OUTPUT_FILE_2, 'w', encoding='utf-8') as f:
-        json.dump(output2_data, f, ensure_ascii=False, indent=2)
-
-    print(f"Done! Created {OUTPUT_FILE_1} and {OUTPUT_FILE_2}")
+
+                size = os.path.getsize(file_path)
+                with open(file_path, 'rb') as f:
+                    start = 0
+                    while start < size:
+                        f.seek(min(start + chunk_bytes, size))
+                        f.readline()
+                        end = min(f.tell(), size)
+                        chunks.append((file_path, start, end))
+                        start = end
+    return chunks
+
+def parse_chunk(chunk):
+    """Parses one byte range; returns its (word, reading, prefix, index) tuples and line count."""
+    file_path, start, end = chunk
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    # Same line endings as iterating over a text-mode file
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+
+    entries = []
+    for line in lines:
+        parsed = parse_line(line)
+        if parsed:
+            entries.append((parsed["word"], parsed["reading"], parsed["prefix"], parsed["index"]))
+    return entries, len(lines)
+
+def iter_parsed(jobs=1, chunk_bytes=CHUNK_BYTES):
+    """Yields parse_chunk results in list_chunks order, from a process pool when jobs > 1."""
+    chunks = list_chunks(chunk_bytes)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            yield from pool.imap(parse_chunk, chunks)
+    else:
+        for chunk in chunks:
+            yield parse_chunk(chunk)
+
+def frequency_row(word, reading, display_value):
+    return [
+        word,
+        "freq",
+        {
+            "reading": reading,
+            "frequency": {
+                "value": 0,
+                "displayValue": f"{ZERO_WIDTH_SPACE}{display_value}"
+            }
+        }
+    ]
+
+def process_dictionary(output_dir=OUTPUT_DIR, jobs=1, chunk_bytes=CHUNK_BYTES, bank_size=BANK_SIZE, stats=None):
+    stats = stats or Instrument("zaliznyak_convert")
+    entries = 0
+    lines = 0
+
+    with stats.stage("convert") as stage, \
+            BankWriter(os.path.join(output_dir, 'index'), "term_meta_bank_", bank_size) as index_bank, \
+            BankWriter(os.path.join(output_dir, 'prefix'), "term_meta_bank_", bank_size) as prefix_bank:
+        start = time.perf_counter()
+        for chunk_entries, chunk_lines in iter_parsed(jobs, chunk_bytes):
+            lines += chunk_lines
+            entries += len(chunk_entries)
+            for word, reading, prefix, index in chunk_entries:
+                index_bank.write(frequency_row(word, reading, index))
+
+                combined_val = f"{prefix} {index}".strip()
+                prefix_bank.write(frequency_row(word, reading, combined_val))
+        seconds = time.perf_counter() - start
+        stage["items"] = entries
+        stage["lines_per_second"] = round(lines / seconds) if seconds else None
+
+    print(f"Parsed {lines} lines into {entries} entries in {seconds:.3f}s ({lines / max(seconds, 1e-9):,.0f} lines/s, {jobs} jobs)")
+    print(f"Done! Wrote {len(index_bank.paths)} banks to each of {index_bank.output_folder} and {prefix_bank.output_folder}")
 
 if __name__ == "__main__":
-    process_dictionary()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=OUTPUT_DIR, help="folder that gets the index/ and prefix/ banks")
+    parser.add_argument("--bank-size", type=int, default=BANK_SIZE, help="rows per term meta bank")
+    parser.add_argument("--jobs", type=int, default=1, help="parse in this many processes (0: one per CPU)")
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES, help="split larger files into ranges of about this size")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    stats = instrument.from_args("zaliznyak_convert", args)
+    process_dictionary(args.output, args.jobs or os.cpu_count(), args.chunk_bytes, args.bank_size, stats)
+    stats.report()
\ No newline at end of file